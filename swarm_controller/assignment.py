@@ -0,0 +1,40 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
+
+
+class SlotAssigner(object):
+    """Bind UAVs to formation slots with a minimum-cost matching.
+
+    The cost is the squared distance, which also keeps the straight paths
+    to the slots from crossing. The matching is cached and only solved again
+    when its cost grows more than drift above the lowest cost seen since the
+    last solve, e.g. when the formation changes shape or moves away.
+    """
+
+    def __init__(self, drift=0.2, tolerance=1.0):
+        self.drift = drift
+        self.tolerance = tolerance
+        self.assignment = None
+        self.reference = np.inf
+        self.solves = 0
+
+    def cost(self, positions, slots):
+        """Total squared distance of the cached assignment."""
+        return np.sum((slots[self.assignment] - positions) ** 2)
+
+    def assign(self, positions, slots):
+        """Return the slots reordered so that row i is the slot of UAV i."""
+        slots = np.asarray(slots)
+        if self.assignment is not None and len(self.assignment) == len(slots):
+            cost = self.cost(positions, slots)
+            if cost <= (1 + self.drift) * self.reference + self.tolerance:
+                self.reference = min(self.reference, cost)
+                return slots[self.assignment]
+
+        _, self.assignment = linear_sum_assignment(
+            cdist(positions, slots, "sqeuclidean")
+        )
+        self.reference = self.cost(positions, slots)
+        self.solves += 1
+        return slots[self.assignment]
@@ -1,31 +1,111 @@
+import os
+from groups import GroupRegistry
+from registry import VehicleRegistry
+
+# Gains of every FormationController and TaskControl behaviour, passed to
+# VelocityComputation.set_parameters. Retune them with sweep.py.
+GAIN_PROFILES = {
+    "merge": dict(
+        v_max=3, r_max=20, k_sep=1.7, k_coh=0.5, k_mig=1, k_rep=9, r_repulsion=8
+    ),
+    "spread": dict(v_max=15, r_max=20, k_sep=35, k_coh=1.3, k_mig=1),
+    "circle": dict(v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1),
+    "line": dict(v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1),
+    "grid": dict(v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1),
+    "slanted_line": dict(v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1),
+    "V": dict(v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1),
+    "diagonal": dict(v_max=12, r_max=25, k_mig=1, k_rep=25, k_sep=0.3, k_coh=0.02),
+    "circle_search": dict(
+        v_max=10, r_max=20, k_mig=0.5, k_rep=25, k_sep=0.3, k_coh=0.02
+    ),
+    "circle_v_search": dict(v_max=5, r_max=30, k_mig=0.4, k_rep=30, k_sep=1, k_coh=0),
+    "line_search": dict(v_max=20, r_max=25, k_mig=0.08, k_rep=25, k_sep=1, k_coh=0.1),
+    "split_search": dict(v_max=10, r_max=20, k_mig=1, k_rep=10, k_sep=0.3, k_coh=0.02),
+    "cover": dict(v_max=10, r_max=30, k_mig=3, k_rep=25, k_sep=2, k_coh=0),
+}
+
+
 class Configuration(object):
     def __init__(self):
-        # List of origin positions for each UAV in the swarm.
-        self.origin = [
-            [0, 0],
-            [2, 0],
-            [4, 0],
-            [0, -3],
-            [2, -2],
-            [4, -3],
-            [0, 3],
-            [2, 2],
-            [4, 3],
-        ]
-
-        # Separate lists for x and y coordinates of the origins.
-        self.origin_x = [0, 2, 4, 0, 2, 4, 0, 2, 4]
-        self.origin_y = [0, 0, 0, -3, -2, -3, 3, 2, 3]
-
-        # Placeholder for z-coordinates, currently unused as the scenario is 2D.
-        self.origin_z = []
+        # Vehicles of the swarm, loaded from settings.json (or HGIC_SETTINGS).
+        self.registry = VehicleRegistry.from_settings()
+
+        # (N, 2) origin position of each UAV in the swarm.
+        self.origin = self.registry.origins[:, :2]
+
+        # Separate arrays for x, y and z coordinates of the origins.
+        self.origin_x = self.registry.origin_x
+        self.origin_y = self.registry.origin_y
+        self.origin_z = self.registry.origins[:, 2]
 
         # Initial count of UAVs based on the number of origins defined.
         self.num_uavs = len(self.origin)
 
+        # Spatial index used for r_max neighbour queries ("grid", "kdtree" or "brute").
+        self.neighbor_index = "grid"
+
+        # Skin (m) of the cached Verlet neighbour list, rebuilt once a UAV moved
+        # more than half of it. None queries the index from scratch every tick.
+        self.neighbor_skin = 4.0
+
+        # Force kernel backend ("auto", "numba" or "numpy"), see flocking.select_backend.
+        self.force_backend = "auto"
+
+        # Number of RPC connections used to dispatch velocity commands in parallel.
+        self.rpc_connections = 4
+
+        # Control loop rate in Hz, the velocity command duration is one period.
+        self.control_rate = 10
+
+        # RPC backend, "airsim" or the headless "sim", see simulator.make_client.
+        self.backend = os.environ.get("HGIC_BACKEND", "airsim")
+
+        # Advance a paused simulation one control period per tick instead of
+        # pacing with the wall clock (HGIC_LOCKSTEP=1), see scheduler.LockStepClock.
+        self.lockstep = os.environ.get("HGIC_LOCKSTEP", "0") == "1"
+
+        # Re-solve the UAV-to-slot matching once its cost grows this fraction
+        # above the best seen, None keeps UAV i on slot i.
+        self.assignment_drift = 0.2
+
+        # Event-triggered commands: resend a UAV's velocity once it changed by
+        # more than command_threshold (m/s) or its command_hold (s) runs out.
+        self.command_threshold = 0.05
+        self.command_hold = 0.5
+
+        # Collision monitor: flag pairs predicted to come within safe_distance
+        # (m) inside collision_horizon (s) if they keep their velocity.
+        self.safe_distance = 2.0
+        self.collision_horizon = 2.0
+        # The monitor checks the r_max pairs of every monitor_every-th tick,
+        # after its commands were sent. None turns it off.
+        self.monitor_every = 1
+
+        # Collision avoidance stage after the flocking forces: None keeps the
+        # repulsion term, "orca" replaces it with reciprocal velocity obstacles
+        # for UAVs of avoidance_radius (m) over avoidance_horizon (s)
+        # (HGIC_AVOIDANCE=orca), see orca.OrcaAvoidance.
+        self.avoidance = os.environ.get("HGIC_AVOIDANCE") or None
+        self.avoidance_radius = 0.9
+        self.avoidance_horizon = 2.0
+
+        # Directory where mission reference paths are saved and reused across
+        # runs, None keeps them in memory only.
+        self.path_cache = None
+
+        # Partition of the swarm into sub-swarms, built by split().
+        self.groups = None
+
+        # Gain set of each behaviour, see GAIN_PROFILES.
+        self.gain_profiles = {name: dict(g) for name, g in GAIN_PROFILES.items()}
+
+    def gains(self, behaviour):
+        """Keyword arguments of set_parameters for the named behaviour."""
+        return dict(self.gain_profiles[behaviour])
+
     def split_three(self):
-        """Divide the number of UAVs into three equal groups."""
-        self.num_uavs = self.num_uavs // 3
+        """Partition the UAVs into three groups."""
+        return self.split(3)
 
     def add(self):
         """Increment the count of UAVs by one if not at max capacity."""
@@ -42,9 +122,15 @@ class Configuration(object):
         else:
             print("No UAVs in the swarm!")
 
-    def split(self, num_groups):
-        """Divide the number of UAVs into specified number of groups."""
-        self.num_uavs = self.num_uavs // num_groups
+    def split(self, num_groups, method="index"):
+        """Partition the UAVs into groups by index or by k-means on their origins."""
+        if method == "kmeans":
+            self.groups = GroupRegistry.by_kmeans(
+                self.origin[: self.num_uavs], num_groups
+            )
+        else:
+            self.groups = GroupRegistry.by_index(self.num_uavs, num_groups)
+        return self.groups
 
     def increase_max_velocity(self):
         """Increase the maximum velocity of the UAVs by one."""
@@ -0,0 +1,79 @@
+import numpy as np
+from scipy.spatial import QhullError, Voronoi
+
+
+def bounded_voronoi(points, lower, upper):
+    """Voronoi cells of points clipped to the box [lower, upper].
+
+    Every point is mirrored across the four box edges. The cells of the
+    original points are then exactly the clipped cells, with no infinite
+    regions to special-case. Returns the Voronoi diagram of the mirrored set.
+    """
+    # Keep points strictly inside, one on an edge would coincide with its mirror
+    margin = 1e-6 * np.max(upper - lower)
+    points = np.clip(points, lower + margin, upper - margin)
+    mirrors = [points]
+    for axis in range(2):
+        for edge in (lower[axis], upper[axis]):
+            mirrored = points.copy()
+            mirrored[:, axis] = 2 * edge - mirrored[:, axis]
+            mirrors.append(mirrored)
+    return Voronoi(np.concatenate(mirrors))
+
+
+def cell_centroids(vor, num_points):
+    """Area-weighted centroids and areas of the first num_points cells."""
+    regions = [vor.regions[r] for r in vor.point_region[:num_points]]
+    lengths = np.fromiter((len(r) for r in regions), int, num_points)
+    vertex = np.concatenate(regions)
+    # Index of the next vertex around the same polygon
+    start = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    local = np.arange(len(vertex)) - start
+    following = vertex[start + (local + 1) % np.repeat(lengths, lengths)]
+    cell = np.repeat(np.arange(num_points), lengths)
+
+    # Shoelace formula, summed per cell
+    p, q = vor.vertices[vertex], vor.vertices[following]
+    cross = p[:, 0] * q[:, 1] - q[:, 0] * p[:, 1]
+    area = np.bincount(cell, cross, num_points) / 2
+    cx = np.bincount(cell, (p[:, 0] + q[:, 0]) * cross, num_points)
+    cy = np.bincount(cell, (p[:, 1] + q[:, 1]) * cross, num_points)
+    centroids = np.stack([cx, cy], 1) / (6 * area[:, np.newaxis])
+    return centroids, np.abs(area)
+
+
+class CoverageController(object):
+    """Lloyd-style coverage of a rectangle from the live UAV positions.
+
+    The bounded Voronoi diagram is only rebuilt once some agent has moved
+    more than tolerance since the last tessellation, otherwise the cached
+    centroids are reused.
+    """
+
+    def __init__(self, lower, upper, tolerance=0.5):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.tolerance = tolerance
+        self.sites = None
+        self.centroids = None
+        self.areas = None
+        self.rebuilds = 0
+
+    def targets(self, positions):
+        """(N, 2) centroid of every UAV's cell."""
+        if self.sites is not None and len(self.sites) == len(positions):
+            moved = np.linalg.norm(positions - self.sites, axis=1).max()
+            if moved <= self.tolerance:
+                return self.centroids
+        try:
+            vor = bounded_voronoi(positions, self.lower, self.upper)
+        except QhullError:
+            # Degenerate layout (e.g. every UAV still on one line), hold the
+            # previous targets or head for the own position until it clears
+            if self.centroids is None or len(self.centroids) != len(positions):
+                return positions
+            return self.centroids
+        self.centroids, self.areas = cell_centroids(vor, len(positions))
+        self.sites = positions.copy()
+        self.rebuilds += 1
+        return self.centroids
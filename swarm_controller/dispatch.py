@@ -0,0 +1,178 @@
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class CommandDispatcher(object):
+    """Send one tick of velocity commands concurrently over a pool of RPC clients.
+
+    AirSim clients are not thread safe, so every connection has a worker
+    thread of its own and the vehicles are split evenly between them. Commands
+    that cannot be sent before the per-tick deadline are dropped instead of
+    being delivered stale, and commands sent after the deadline are counted as
+    late. A connection still busy with an earlier tick skips this one, its
+    commands counted as dropped and the skip as busy. With deadline=None
+    every command is delivered before the tick returns.
+    """
+
+    def __init__(self, client_factory, num_connections=4, deadline=0.1):
+        self.num_connections = max(1, int(num_connections))
+        self.clients = [client_factory() for _ in range(self.num_connections)]
+        self.executors = [
+            ThreadPoolExecutor(max_workers=1) for _ in range(self.num_connections)
+        ]
+        self.running = [None] * self.num_connections
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.tick = 0
+        self.stats = {"ticks": 0, "sent": 0, "late": 0, "dropped": 0, "busy": 0}
+        self.last_tick = dict(self.stats)
+
+    def _send_chunk(self, client, commands, z_cmd, duration, tick, deadline_at):
+        sent = late = dropped = 0
+        for name, vx, vy in commands:
+            # A newer tick has started or this one ran out of time: drop the rest
+            if self.tick != tick or time.perf_counter() > deadline_at:
+                dropped += 1
+                continue
+            client.moveByVelocityZAsync(vx, vy, z_cmd, duration, vehicle_name=name)
+            sent += 1
+            if time.perf_counter() > deadline_at:
+                late += 1
+        with self.lock:
+            self.stats["sent"] += sent
+            self.stats["late"] += late
+            self.stats["dropped"] += dropped
+        return sent, late, dropped
+
+    def send_velocities(self, names, v_cmd, z_cmd, duration=0.1):
+        """Send v_cmd (2, N) to the named vehicles, returning this tick's counters."""
+        self.tick += 1
+        if self.deadline is None:
+            deadline_at = float("inf")
+        else:
+            deadline_at = time.perf_counter() + self.deadline
+        commands = [
+            (name, float(v_cmd[0, i]), float(v_cmd[1, i]))
+            for i, name in enumerate(names)
+        ]
+        chunks = [
+            commands[k :: self.num_connections] for k in range(self.num_connections)
+        ]
+        futures = {}
+        sent = late = dropped = busy = 0
+        for k, (client, chunk) in enumerate(zip(self.clients, chunks)):
+            if not chunk:
+                continue
+            if self.running[k] is not None and not self.running[k].done():
+                dropped += len(chunk)
+                busy += 1
+                continue
+            self.running[k] = self.executors[k].submit(
+                self._send_chunk, client, chunk, z_cmd, duration, self.tick, deadline_at
+            )
+            futures[self.running[k]] = len(chunk)
+        with self.lock:
+            self.stats["dropped"] += dropped
+            self.stats["busy"] += busy
+        done, not_done = wait(futures, timeout=self.deadline)
+
+        for future in done:
+            s, l, d = future.result()
+            sent, late, dropped = sent + s, late + l, dropped + d
+        # Workers still running will drop their remaining commands on their own
+        self.last_tick = {
+            "sent": sent,
+            "late": late,
+            "dropped": dropped,
+            "pending": sum(futures[future] for future in not_done),
+        }
+        self.stats["ticks"] += 1
+        return self.last_tick
+
+    def report(self):
+        """Cumulative counters over every tick dispatched so far."""
+        with self.lock:
+            return dict(self.stats)
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+
+
+class DirectSender(object):
+    """Send a tick of velocity commands one by one over a single client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def send_velocities(self, names, v_cmd, z_cmd, duration=0.1):
+        for i, name in enumerate(names):
+            self.client.moveByVelocityZAsync(
+                float(v_cmd[0, i]),
+                float(v_cmd[1, i]),
+                z_cmd,
+                duration,
+                vehicle_name=name,
+            )
+        return {"sent": len(names), "late": 0, "dropped": 0, "pending": 0}
+
+
+class EventTriggeredSender(object):
+    """Only resend the velocity commands that changed or are about to expire.
+
+    Commands go out with a duration of hold seconds instead of one tick. A
+    vehicle gets a new command when its velocity or altitude moved more
+    than threshold from the last one sent, or when the last one would
+    expire before the next tick, so RPC traffic follows swarm activity
+    rather than swarm size. Works on top of a CommandDispatcher or a
+    DirectSender.
+    """
+
+    def __init__(self, sender, threshold=0.05, hold=0.5, clock=None):
+        self.sender = sender
+        self.threshold = threshold
+        self.hold = hold
+        self.now = clock.now if clock is not None else time.perf_counter
+        self.names = None
+        self.stats = {"ticks": 0, "sent": 0, "suppressed": 0}
+
+    def reset(self, names):
+        """Forget what was sent, the next tick sends every command."""
+        self.names = list(names)
+        self.last_v = np.zeros((len(self.names), 2))
+        self.last_z = np.zeros(len(self.names))
+        self.expires = np.full(len(self.names), -np.inf)
+
+    def send_velocities(self, names, v_cmd, z_cmd, period=0.1):
+        """Send the changed part of v_cmd (2, N), period being the tick length."""
+        if self.names != list(names):
+            self.reset(names)
+        now = self.now()
+        v = np.asarray(v_cmd, dtype=float).T
+        changed = (np.abs(v - self.last_v).max(axis=1) > self.threshold) | (
+            np.abs(z_cmd - self.last_z) > self.threshold
+        )
+        # Renew commands that would run out before the tick after next
+        expiring = self.expires - now < 2 * period
+        send = np.flatnonzero(changed | expiring)
+
+        result = self.sender.send_velocities(
+            [self.names[i] for i in send], v_cmd[:, send], z_cmd, self.hold
+        )
+        self.last_v[send] = v[send]
+        self.last_z[send] = z_cmd
+        if result["dropped"] or result["pending"]:
+            # Not known which ones made it, resend all of them next tick
+            self.expires[send] = -np.inf
+        else:
+            self.expires[send] = now + self.hold
+
+        self.stats["ticks"] += 1
+        self.stats["sent"] += len(send)
+        self.stats["suppressed"] += len(self.names) - len(send)
+        return result
+
+    def report(self):
+        return dict(self.stats)
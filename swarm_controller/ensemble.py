@@ -0,0 +1,250 @@
+import sys
+import numpy as np
+from assignment import SlotAssigner
+from flocking import select_backend, tracking_velocity
+from formation_table import formation_slots
+from neighbors import make_index
+from orca import OrcaAvoidance
+from registry import VehicleRegistry
+from scipy.spatial import cKDTree
+from simulator import SimWorld
+
+
+class EnsembleRun(object):
+    """B independent swarms of N UAVs advanced together on the headless simulator.
+
+    All B * N vehicles live in one SimWorld and the force kernel runs once
+    per tick on the flattened array, so a Monte Carlo batch costs about one
+    vectorized run. Each swarm is shifted along x for the neighbour search
+    so that no pair ever spans two runs. Positions, targets and commands are
+    (B, N, 2) arrays. avoidance="orca" replaces the repulsion term with
+    reciprocal velocity obstacles, as Configuration.avoidance does.
+    """
+
+    def __init__(
+        self,
+        positions,
+        period=0.1,
+        noise=0.0,
+        seed=0,
+        neighbor_index="grid",
+        force_backend="auto",
+        assignment_drift=0.2,
+        avoidance=None,
+        avoidance_radius=0.9,
+        avoidance_horizon=2.0,
+        **world_kwargs,
+    ):
+        positions = np.asarray(positions, dtype=float)
+        self.batch, self.num_uavs = positions.shape[:2]
+        names = [
+            f"run{b}/UAV{i + 1}"
+            for b in range(self.batch)
+            for i in range(self.num_uavs)
+        ]
+        self.world = SimWorld(names, positions.reshape(-1, 2), **world_kwargs)
+        self.period = period
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.neighbor_index = neighbor_index
+        self.flocking_terms = select_backend(force_backend)
+        self.assigners = None
+        if assignment_drift is not None:
+            self.assigners = [SlotAssigner(assignment_drift) for _ in range(self.batch)]
+        self.avoidance = None
+        if avoidance == "orca":
+            self.avoidance = OrcaAvoidance(
+                avoidance_radius, avoidance_horizon, period=period
+            )
+        elif avoidance is not None:
+            raise ValueError(f"Unknown avoidance mode: {avoidance}")
+        self.set_parameters()
+
+    @classmethod
+    def perturbed(cls, origins, batch, spread=1.0, seed=0, **kwargs):
+        """batch copies of the (N, 2) origins, each UAV moved by N(0, spread) noise."""
+        rng = np.random.default_rng(seed)
+        origins = np.asarray(origins, dtype=float)[:, :2]
+        positions = origins + rng.normal(0, spread, (batch,) + origins.shape)
+        return cls(positions, seed=seed, **kwargs)
+
+    def set_parameters(
+        self, v_max=0, r_max=20, k_sep=0, k_coh=0, k_mig=1, k_rep=0, r_repulsion=0
+    ):
+        # Same gains as VelocityComputation.set_parameters
+        self.v_max = v_max
+        self.r_max = r_max
+        self.k_sep = k_sep
+        self.k_coh = k_coh
+        self.k_mig = k_mig
+        self.k_rep = k_rep
+        self.r_repulsion = r_repulsion
+        self.index = make_index(self.neighbor_index, r_max)
+        if self.avoidance is not None:
+            self.avoidance.neighbor_dist = r_max
+
+    @property
+    def positions(self):
+        """(B, N, 2) positions of every swarm."""
+        return self.world.world_positions()[:, :2].reshape(self.batch, -1, 2)
+
+    def separated(self, positions):
+        """Flattened (B * N, 2) positions with the runs laid side by side.
+
+        Consecutive runs are further apart than r_max, so no pair spans two.
+        """
+        span = np.ptp(positions[..., 0]) + 2 * self.r_max
+        offset = np.zeros((self.batch, 1, 2))
+        offset[:, 0, 0] = span * np.arange(self.batch)
+        return (positions + offset).reshape(-1, 2)
+
+    def neighbor_forces(self, positions, rep_dis, add_rep=True):
+        """Separation, cohesion and repulsion of every swarm as (B, N, 2) arrays."""
+        flat = positions.reshape(-1, 2)
+        self.index.build(self.separated(positions))
+        pairs = self.index.query_pairs(self.r_max)
+        terms = self.flocking_terms(
+            flat,
+            self.k_sep,
+            self.k_coh,
+            self.k_rep,
+            self.r_max,
+            rep_dis,
+            add_rep,
+            pairs=pairs,
+        )
+        # The kernels average over the other UAVs of the whole flattened array
+        scale = (len(flat) - 1) / max(self.num_uavs - 1, 1)
+        return [scale * term.reshape(positions.shape) for term in terms]
+
+    def assign_slots(self, positions, slots):
+        """(B, N, 2) slots reordered so that row i is the slot of UAV i in each run."""
+        slots = np.broadcast_to(slots, positions.shape)
+        if self.assigners is None:
+            return slots
+        return np.stack(
+            [a.assign(p, s) for a, p, s in zip(self.assigners, positions, slots)]
+        )
+
+    def formation_tick(self, slots, rep_dis, assign=True, rep_gain=1, clamp=True):
+        """Velocity commands of every swarm towards its (N, 2) or (B, N, 2) slots.
+
+        assign, rep_gain and clamp select the force law of the behaviour
+        flown, see tracking_velocity: the formations assign slots and clamp
+        the command, the moving missions of VelocityComputation differ.
+        """
+        positions = self.positions
+        if assign:
+            slots = self.assign_slots(positions, slots)
+        else:
+            slots = np.broadcast_to(slots, positions.shape)
+        # Same step as VelocityComputation.formation_tick
+        forces = self.neighbor_forces(positions, rep_dis, self.avoidance is None)
+        v_max = self.v_max if clamp else None
+        v_cmd = tracking_velocity(positions, slots, forces, self.k_mig, v_max, rep_gain)
+        v_cmd = v_cmd.reshape(-1, 2)
+        if self.avoidance is not None:
+            # Same side-by-side layout as the neighbour index built above,
+            # with the last commands as the velocities the UAVs are flying
+            v_cmd = self.avoidance.velocities(
+                self.separated(positions),
+                self.world.cmd_velocity,
+                v_cmd,
+                self.v_max,
+                self.index,
+            )
+        return positions, slots, v_cmd.reshape(positions.shape)
+
+    def step(self, v_cmd):
+        """Hold the (B, N, 2) commands, plus noise, for one period of simulated time."""
+        v_cmd = np.reshape(v_cmd, (-1, 2))
+        if self.noise:
+            v_cmd = v_cmd + self.rng.normal(0, self.noise, v_cmd.shape)
+        world = self.world
+        world.cmd_velocity[:] = v_cmd
+        world.cmd_until[:] = world.time + self.period
+        world.step(self.period)
+
+    def run_path(self, path, rep_dis, **law):
+        """Track a (T, N, 2) reference, returning the (T, B, N, 2) trajectories.
+
+        The slot each UAV was sent to at every tick is kept in targets. law
+        holds the force law arguments of formation_tick.
+        """
+        path = np.asarray(path)
+        shape = (len(path), self.batch, self.num_uavs, 2)
+        trajectories = np.empty(shape, np.float32)
+        self.targets = np.empty(shape, np.float32)
+        for t, slots in enumerate(path):
+            positions, self.targets[t], v_cmd = self.formation_tick(
+                slots[:, :2], rep_dis, **law
+            )
+            trajectories[t] = positions
+            self.step(v_cmd)
+        return trajectories
+
+    def run_formation(self, type, rep_dis, spacing, steps):
+        """Fly every swarm into a formation, returning the (T, B, N, 2) trajectories."""
+        slots = formation_slots(type, self.num_uavs, spacing)
+        return self.run_path(np.broadcast_to(slots, (steps,) + slots.shape), rep_dis)
+
+
+def min_separation(trajectories):
+    """(B,) smallest distance between two UAVs of each run of (T, B, N, 2) trajectories.
+
+    One KD-tree per tick over all runs, laid side by side further apart than
+    any two UAVs of a run, so memory stays linear in B * N.
+    """
+    ticks, batch, n = trajectories.shape[:3]
+    separation = np.full(batch, np.inf)
+    if n < 2:
+        return separation
+    for positions in trajectories:
+        extent = np.ptp(positions, axis=(0, 1)).sum()
+        offset = np.zeros((batch, 1, 2))
+        offset[:, 0, 0] = (2 * extent + 1) * np.arange(batch)
+        nearest, _ = cKDTree((positions + offset).reshape(-1, 2)).query(
+            (positions + offset).reshape(-1, 2), k=2
+        )
+        separation = np.minimum(separation, nearest[:, 1].reshape(batch, n).min(axis=1))
+    return separation
+
+
+def ensemble_metrics(trajectories, targets=None, tolerance=1.0, period=0.1):
+    """Per-run statistics of (T, B, N, 2) trajectories.
+
+    Returns a dict of (B,) arrays: the path length flown by each swarm, the
+    smallest distance between two of its UAVs and, when the (T, B, N, 2) or
+    (B, N, 2) targets are given, the time after which every UAV stays within
+    tolerance of its target (inf if it never settles) and the final error,
+    the worst distance to target averaged over the last tenth of the run.
+    """
+    trajectories = np.asarray(trajectories, dtype=float)
+    steps = np.linalg.norm(np.diff(trajectories, axis=0), axis=-1)
+    metrics = {"path_length": steps.sum(axis=(0, 2))}
+
+    metrics["min_separation"] = min_separation(trajectories)
+
+    if targets is not None:
+        error = np.linalg.norm(trajectories - targets, axis=-1).max(axis=-1)
+        outside = error > tolerance
+        # Last tick outside the tolerance, counted from the end
+        last = len(error) - np.argmax(outside[::-1], axis=0)
+        settled = np.where(outside.any(axis=0), last, 0)
+        settled = np.where(outside[-1], np.inf, settled * period)
+        metrics["convergence_time"] = settled
+        metrics["final_error"] = error[-max(len(error) // 10, 1) :].mean(axis=0)
+    return metrics
+
+
+if __name__ == "__main__":
+    # e.g. python ensemble.py circle 100: statistics over 100 perturbed starts
+    ensemble = EnsembleRun.perturbed(
+        VehicleRegistry.from_settings().origins, int(sys.argv[2]), spread=2.0
+    )
+    ensemble.set_parameters(
+        v_max=5, r_max=20, k_sep=1, k_coh=0.1, k_mig=0.5, k_rep=3, r_repulsion=3
+    )
+    trajectories = ensemble.run_formation(sys.argv[1], 5, 17, 700)
+    for key, values in ensemble_metrics(trajectories, ensemble.targets).items():
+        print(key, "min/median/max", np.percentile(values, [0, 50, 100]).round(2))
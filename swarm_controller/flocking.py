@@ -0,0 +1,253 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Numba is optional, the NumPy kernels are always available
+    numba = None
+
+
+def pairwise_displacements(positions):
+    """Return r_ij = pos_j - pos_i as an (N, N, 2) tensor and the (N, N) distances."""
+    r_ij = positions[np.newaxis, :, :] - positions[:, np.newaxis, :]
+    distances = np.sqrt((r_ij**2).sum(axis=-1))
+    return r_ij, distances
+
+
+def flocking_terms(
+    positions, k_sep, k_coh, k_rep, r_max, rep_dis=0, add_rep=False, pairs=None
+):
+    """Compute separation, cohesion and repulsion for the whole swarm in one pass.
+
+    Each term is summed over the neighbours within r_max and averaged over the
+    N - 1 other UAVs, exactly like the per-pair loop in VelocityComputation.
+    pairs, when given, is the (i, j) output of a neighbour index and replaces
+    the dense all-pairs pass. Returns three (N, 2) arrays.
+    """
+    if pairs is not None:
+        return pair_flocking_terms(
+            positions, pairs, k_sep, k_coh, k_rep, r_max, rep_dis, add_rep
+        )
+
+    n = positions.shape[0]
+    r_ij, distances = pairwise_displacements(positions)
+
+    # Only pairs inside the interaction radius contribute, never the UAV itself
+    neighbor = (distances < r_max) & ~np.eye(n, dtype=bool)
+    inv_dist = np.divide(
+        1.0, distances, out=np.zeros_like(distances), where=distances > 0
+    )
+    unit = r_ij * inv_dist[:, :, np.newaxis]
+
+    weight_sep = np.where(neighbor, -k_sep, 0.0)
+    weight_coh = np.where(neighbor, k_coh, 0.0)
+    v_sep = np.einsum("ij,ijk->ik", weight_sep, unit)
+    v_coh = np.einsum("ij,ijk->ik", weight_coh, r_ij)
+
+    if add_rep:
+        close = neighbor & (distances < rep_dis)
+        weight_rep = np.where(close, -k_rep * (rep_dis - distances), 0.0)
+        v_rep = np.einsum("ij,ijk->ik", weight_rep, unit)
+    else:
+        v_rep = np.zeros_like(positions, dtype=float)
+
+    n_others = max(n - 1, 1)
+    return v_sep / n_others, v_coh / n_others, v_rep / n_others
+
+
+def pair_flocking_terms(
+    positions, pairs, k_sep, k_coh, k_rep, r_max, rep_dis=0, add_rep=False
+):
+    """Sparse version of flocking_terms over the (i, j) pairs of a neighbour index."""
+    n = positions.shape[0]
+    i, j = pairs
+    r_ij = positions[j] - positions[i]
+    distances = np.sqrt((r_ij**2).sum(axis=-1))
+    keep = (distances < r_max) & (i != j)
+    i, j, r_ij, distances = i[keep], j[keep], r_ij[keep], distances[keep]
+
+    inv_dist = np.divide(
+        1.0, distances, out=np.zeros_like(distances), where=distances > 0
+    )
+    unit = r_ij * inv_dist[:, np.newaxis]
+
+    def scatter(values):
+        # Sum the per-pair vectors into their owner UAV
+        return np.stack(
+            [
+                np.bincount(i, weights=values[:, 0], minlength=n),
+                np.bincount(i, weights=values[:, 1], minlength=n),
+            ],
+            axis=1,
+        )
+
+    v_sep = scatter(-k_sep * unit)
+    v_coh = scatter(k_coh * r_ij)
+    if add_rep:
+        weight_rep = np.where(distances < rep_dis, -k_rep * (rep_dis - distances), 0.0)
+        v_rep = scatter(weight_rep[:, np.newaxis] * unit)
+    else:
+        v_rep = np.zeros((n, 2))
+
+    n_others = max(n - 1, 1)
+    return v_sep / n_others, v_coh / n_others, v_rep / n_others
+
+
+def migration_velocity(positions, pos_mig, k_mig):
+    """Unit-speed pull of every UAV towards the migration point, scaled by k_mig.
+
+    pos_mig is either one shared point or an (N, 2) array of per-UAV targets.
+    """
+    r_mig = np.reshape(pos_mig, (-1, 2)) - positions
+    norm = np.linalg.norm(r_mig, axis=1, keepdims=True)
+    return k_mig * np.divide(r_mig, norm, out=np.zeros_like(r_mig), where=norm > 0)
+
+
+def clamp_speed(velocities, v_max):
+    """Scale every (..., 2) velocity whose norm exceeds v_max back onto v_max."""
+    norm = np.linalg.norm(velocities, axis=-1, keepdims=True)
+    scale = np.where(norm > v_max, v_max / np.where(norm > 0, norm, 1.0), 1.0)
+    return velocities * scale
+
+
+def tracking_velocity(positions, targets, forces, k_mig, v_max=None, rep_gain=1):
+    """Command of every UAV flying to its target under the neighbour forces.
+
+    forces is the (v_sep, v_coh, v_rep) tuple of the flocking terms, with the
+    same (..., N, 2) shape as positions and targets. Formations clamp the
+    command to v_max, the moving missions leave it unclamped (v_max=None)
+    and some weigh the repulsion by rep_gain.
+    """
+    v_sep, v_coh, v_rep = forces
+    v_cmd = k_mig * (targets - positions) + rep_gain * v_rep + v_sep + v_coh
+    return v_cmd if v_max is None else clamp_speed(v_cmd, v_max)
+
+
+def flocking_velocity(
+    positions,
+    pos_mig,
+    k_sep,
+    k_coh,
+    k_mig,
+    k_rep,
+    r_max,
+    v_max,
+    rep_dis=0,
+    add_rep=False,
+    pairs=None,
+):
+    """Vectorized replacement for the nested loop in compute_velocity.
+
+    positions is an (N, 2) array, the result is the clamped (N, 2) command.
+    """
+    positions = np.asarray(positions, dtype=float)
+    v_sep, v_coh, v_rep = flocking_terms(
+        positions, k_sep, k_coh, k_rep, r_max, rep_dis, add_rep, pairs
+    )
+    v_mig = migration_velocity(positions, pos_mig, k_mig)
+    return clamp_speed(v_sep + v_coh + v_rep + v_mig, v_max)
+
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _accumulate_pairs(
+        positions, pair_i, pair_j, k_sep, k_coh, k_rep, r_max, rep_dis, add_rep, out
+    ):
+        # out[:, 0:2] separation, out[:, 2:4] cohesion, out[:, 4:6] repulsion
+        for p in range(pair_i.shape[0]):
+            i = pair_i[p]
+            j = pair_j[p]
+            if i == j:
+                continue
+            dx = positions[j, 0] - positions[i, 0]
+            dy = positions[j, 1] - positions[i, 1]
+            d = np.sqrt(dx * dx + dy * dy)
+            if d >= r_max:
+                continue
+            out[i, 2] += k_coh * dx
+            out[i, 3] += k_coh * dy
+            if d > 0:
+                out[i, 0] -= k_sep * dx / d
+                out[i, 1] -= k_sep * dy / d
+                if add_rep and d < rep_dis:
+                    w = -k_rep * (rep_dis - d) / d
+                    out[i, 4] += w * dx
+                    out[i, 5] += w * dy
+
+    @numba.njit(cache=True)
+    def _accumulate_dense(positions, k_sep, k_coh, k_rep, r_max, rep_dis, add_rep, out):
+        # Visit every unordered pair once and apply it to both UAVs
+        n = positions.shape[0]
+        for i in range(n):
+            for j in range(i + 1, n):
+                dx = positions[j, 0] - positions[i, 0]
+                dy = positions[j, 1] - positions[i, 1]
+                d = np.sqrt(dx * dx + dy * dy)
+                if d >= r_max:
+                    continue
+                out[i, 2] += k_coh * dx
+                out[i, 3] += k_coh * dy
+                out[j, 2] -= k_coh * dx
+                out[j, 3] -= k_coh * dy
+                if d > 0:
+                    sx = k_sep * dx / d
+                    sy = k_sep * dy / d
+                    out[i, 0] -= sx
+                    out[i, 1] -= sy
+                    out[j, 0] += sx
+                    out[j, 1] += sy
+                    if add_rep and d < rep_dis:
+                        w = -k_rep * (rep_dis - d) / d
+                        out[i, 4] += w * dx
+                        out[i, 5] += w * dy
+                        out[j, 4] -= w * dx
+                        out[j, 5] -= w * dy
+
+
+def numba_flocking_terms(
+    positions, k_sep, k_coh, k_rep, r_max, rep_dis=0, add_rep=False, pairs=None
+):
+    """Numba-compiled drop-in for flocking_terms, accumulating in place."""
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    n = positions.shape[0]
+    out = np.zeros((n, 6))
+    args = (float(k_sep), float(k_coh), float(k_rep), float(r_max), float(rep_dis))
+    if pairs is None:
+        _accumulate_dense(positions, *args, bool(add_rep), out)
+    else:
+        pair_i = np.ascontiguousarray(pairs[0], dtype=np.int64)
+        pair_j = np.ascontiguousarray(pairs[1], dtype=np.int64)
+        _accumulate_pairs(positions, pair_i, pair_j, *args, bool(add_rep), out)
+    out /= max(n - 1, 1)
+    return out[:, 0:2], out[:, 2:4], out[:, 4:6]
+
+
+FORCE_BACKENDS = {"numpy": flocking_terms}
+if numba is not None:
+    FORCE_BACKENDS["numba"] = numba_flocking_terms
+
+
+def select_backend(name="auto"):
+    """Return the flocking_terms implementation registered under name.
+
+    "auto" prefers Numba. Asking for Numba when it is not installed falls back
+    to the NumPy kernel.
+    """
+    if name == "auto":
+        name = "numba" if numba is not None else "numpy"
+    if name == "numba" and numba is None:
+        print("Numba is not installed, using the NumPy force kernel")
+        name = "numpy"
+    if name not in FORCE_BACKENDS:
+        raise ValueError(f"Unknown force backend: {name}")
+    return FORCE_BACKENDS[name]
+
+
+def backend_error(backend, num_uavs=500, r_max=20, seed=0):
+    """Largest deviation of backend from the NumPy reference on a random swarm."""
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(-5 * r_max, 5 * r_max, (num_uavs, 2))
+    gains = (1.7, 0.5, 9, r_max, r_max / 2, True)
+    reference = flocking_terms(positions, *gains)
+    result = backend(positions, *gains)
+    return max(np.abs(a - b).max() for a, b in zip(reference, result))
@@ -1,5 +1,4 @@
 import timeit
-import airsim
 from velocity import VelocityComputation
 
 
@@ -22,54 +21,54 @@ class FormationController(object):
 
     def merge(self):
         """Merge the formation."""
-        self.control.set_parameters(
-            v_max=3, r_max=20, k_sep=1.7, k_coh=0.5, k_mig=1, k_rep=9, r_repulsion=8
-        )
+        self.control.set_parameters(**self.control.config.gains("merge"))
         self.control.pos_mig = self.control.get_swarm_center()
         self.run_loop(True, 8, 5, 500)
 
     def spread(self):
         """Spread the formation."""
-        self.control.set_parameters(v_max=15, r_max=20, k_sep=35, k_coh=1.3, k_mig=1)
+        self.control.set_parameters(**self.control.config.gains("spread"))
         self.control.pos_mig = self.control.get_swarm_center()
         self.run_loop(False, 0, 0, 300)
 
     def circle(self):
         """Make the drones form a circle."""
-        self.control.set_parameters(
-            v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1
-        )
+        self.control.set_parameters(**self.control.config.gains("circle"))
         self.control.pos_mig = self.control.get_swarm_center()
         self.control.form_circle(10, 10)
 
     def line(self):
         """Make the drones form a line."""
-        self.control.set_parameters(
-            v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1
-        )
+        self.control.set_parameters(**self.control.config.gains("line"))
         self.control.pos_mig = self.control.get_swarm_center()
         self.control.form_line(13, 7)
 
+    def grid(self):
+        """Make the drones form a grid."""
+        self.control.set_parameters(**self.control.config.gains("grid"))
+        self.control.form_grid(13, 7)
+
+    def slanted_line(self):
+        """Make the drones form a slanted line."""
+        self.control.set_parameters(**self.control.config.gains("slanted_line"))
+        self.control.form_slanted_line(13, 7)
+
     def V_formation(self):
         """Make the drones form a V-formation."""
-        self.control.set_parameters(
-            v_max=20, r_max=25, k_mig=2, k_rep=25, k_sep=15, k_coh=0.1
-        )
+        self.control.set_parameters(**self.control.config.gains("V"))
         self.control.form_V(10, 7)
 
     def diagonal(self):
         """Make the drones form a diagonal."""
-        self.control.set_parameters(
-            v_max=12, r_max=25, k_mig=1, k_rep=25, k_sep=0.3, k_coh=0.02
-        )
-        for _ in range(600):
+        self.control.set_parameters(**self.control.config.gains("diagonal"))
+        for _ in self.control.scheduler.ticks(600):
             self.control.form_diagonal(13, 8)
             self.move_UAVs(self.z_cmd)
             self.degbug_info()
 
     def run_loop(self, add_rep, rep_dis, safe_dis, t=0):
         """Main loop to compute velocity and move the drones."""
-        for _ in range(t):
+        for _ in self.control.scheduler.ticks(t):
             self.compute_velocity(rep_dis, safe_dis, add_rep)
             self.move_UAVs(self.z_cmd)
 
@@ -0,0 +1,67 @@
+import functools
+import numpy as np
+
+
+# Every entry maps (num_uavs, spacing) to an (N, 2) table of slot offsets
+# around the group center. Adding a shape only needs a new entry here.
+def circle_slots(num_uavs, spacing):
+    formation_angle = 2 * np.pi / num_uavs * np.arange(num_uavs)
+    return spacing * np.stack([np.cos(formation_angle), np.sin(formation_angle)], 1)
+
+
+def line_slots(num_uavs, spacing):
+    index = np.arange(num_uavs)
+    return np.stack([index * spacing, np.zeros(num_uavs)], 1)
+
+
+def diagonal_slots(num_uavs, spacing):
+    # For a diagonal, row index equals column index
+    index = np.arange(num_uavs)
+    return np.stack([index * spacing, index * spacing], 1)
+
+
+def v_slots(num_uavs, spacing):
+    offset = np.arange(num_uavs) - num_uavs // 2
+    return np.stack([np.abs(offset) * spacing, offset * spacing], 1)
+
+
+def grid_slots(num_uavs, spacing):
+    # Square-ish grid of ceil(sqrt(N)) columns, filled row by row. The
+    # test.form_grid_formation prototype has 30 fixed columns instead, which
+    # puts any swarm of up to 30 UAVs in a single row
+    cols = int(np.ceil(np.sqrt(num_uavs)))
+    index = np.arange(num_uavs)
+    return np.stack([index % cols, index // cols], 1) * float(spacing)
+
+
+def slanted_line_slots(num_uavs, spacing):
+    # One unit of lateral offset per UAV, as in test.form_slanted_line_formation
+    index = np.arange(num_uavs)
+    return np.stack([index * spacing, index], 1).astype(float)
+
+
+FORMATIONS = {
+    "circle": circle_slots,
+    "line": line_slots,
+    "diagonal": diagonal_slots,
+    "V": v_slots,
+    "grid": grid_slots,
+    "slanted_line": slanted_line_slots,
+}
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_slots(type, num_uavs, spacing):
+    table = np.ascontiguousarray(FORMATIONS[type](num_uavs, spacing), dtype=float)
+    table.setflags(write=False)
+    return table
+
+
+def formation_slots(type, num_uavs, spacing, group_center=None):
+    """Return the (N, 2) slot table of a formation, cached by (type, N, spacing)."""
+    if type not in FORMATIONS:
+        raise ValueError(f"Unknown formation type: {type}")
+    table = _cached_slots(type, int(num_uavs), float(spacing))
+    if group_center is None:
+        return table
+    return table + np.reshape(group_center, (1, 2))
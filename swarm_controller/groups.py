@@ -0,0 +1,64 @@
+import numpy as np
+from scipy.cluster.vq import kmeans2
+
+
+class GroupRegistry(object):
+    """Partition of the swarm into sub-swarms.
+
+    labels[i] is the group of UAV i. members is a (G, M) table of UAV
+    indices padded with -1, M being the size of the largest group, so a
+    behaviour can run for every group at once on (G, M, ...) arrays.
+    """
+
+    def __init__(self, labels):
+        # Renumber so that groups are 0..G-1 with no empty group
+        _, self.labels = np.unique(np.asarray(labels), return_inverse=True)
+        self.num_uavs = len(self.labels)
+        self.sizes = np.bincount(self.labels)
+        self.num_groups = len(self.sizes)
+
+        order = np.argsort(self.labels, kind="stable")
+        rank = np.arange(self.num_uavs) - np.repeat(
+            np.cumsum(self.sizes) - self.sizes, self.sizes
+        )
+        self.members = np.full((self.num_groups, self.sizes.max()), -1)
+        self.members[self.labels[order], rank] = order
+        self.mask = self.members >= 0
+        # Slot of every UAV inside its group
+        self.rank = np.empty(self.num_uavs, int)
+        self.rank[order] = rank
+
+    @classmethod
+    def by_index(cls, num_uavs, num_groups):
+        """Consecutive blocks of UAVs, UAV1..UAVk in the first group and so on."""
+        return cls(np.arange(num_uavs) * num_groups // num_uavs)
+
+    @classmethod
+    def by_kmeans(cls, positions, num_groups, seed=0):
+        """Group UAVs that are close to each other with k-means on (N, 2) positions."""
+        _, labels = kmeans2(
+            np.asarray(positions, dtype=float), num_groups, minit="++", seed=seed
+        )
+        return cls(labels)
+
+    def group(self, g):
+        """UAV indices of group g."""
+        return self.members[g, self.mask[g]]
+
+    def gather(self, values):
+        """(N, ...) per-UAV values to the padded (G, M, ...) layout, padding with 0."""
+        grouped = np.asarray(values)[np.maximum(self.members, 0)]
+        grouped[~self.mask] = 0
+        return grouped
+
+    def scatter(self, grouped):
+        """(G, M, ...) values back to (N, ...) per-UAV order."""
+        return grouped[self.labels, self.rank]
+
+    def centers(self, positions):
+        """(G, 2) mean position of every group."""
+        return self.gather(positions).sum(axis=1) / self.sizes[:, np.newaxis]
+
+    def same_group(self, i, j):
+        """Mask of the (i, j) pairs whose UAVs belong to the same group."""
+        return self.labels[i] == self.labels[j]
@@ -0,0 +1,97 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+from scheduler import WallClock
+
+
+class LaunchOrchestrator(object):
+    """Arm and launch the whole swarm concurrently, then wait until it is airborne.
+
+    Like the CommandDispatcher, every RPC connection has a worker thread of
+    its own and handles an even share of the vehicles. A worker enables, arms and
+    launches all of its vehicles before joining any of their futures, so
+    the launch takes about as long as one take-off whatever the fleet
+    size. launch() returns once every vehicle reached altitude or timeout
+    ran out, with the names of the vehicles that did not make it.
+    """
+
+    def __init__(
+        self,
+        client_factory,
+        num_connections=4,
+        altitude=-3.0,
+        climb_speed=1.0,
+        tolerance=0.3,
+    ):
+        self.num_connections = max(1, int(num_connections))
+        self.clients = [client_factory() for _ in range(self.num_connections)]
+        self.executors = [
+            ThreadPoolExecutor(max_workers=1) for _ in range(self.num_connections)
+        ]
+        self.running = [None] * self.num_connections
+        self.altitude = altitude
+        self.climb_speed = climb_speed
+        self.tolerance = tolerance
+
+    def _submit(self, k, fn, names):
+        self.running[k] = self.executors[k].submit(fn, self.clients[k], names)
+        return self.running[k]
+
+    def _launch_chunk(self, client, names):
+        for name in names:
+            client.enableApiControl(True, name)
+            client.armDisarm(True, name)
+        # Issue every command first so the vehicles climb at the same time
+        for future in [client.takeoffAsync(vehicle_name=name) for name in names]:
+            future.join()
+        for future in [
+            client.moveToZAsync(self.altitude, self.climb_speed, vehicle_name=name)
+            for name in names
+        ]:
+            future.join()
+
+    def _altitudes(self, client, names):
+        return [
+            client.simGetGroundTruthKinematics(vehicle_name=name).position.z_val
+            for name in names
+        ]
+
+    def altitudes(self, names):
+        """(N,) NED z of the named vehicles, read over the connection pool.
+
+        Vehicles of a connection still busy launching read as NaN.
+        """
+        names = list(names)
+        z = np.full(len(names), np.nan)
+        futures = {}
+        for k in range(self.num_connections):
+            chunk = names[k :: self.num_connections]
+            if chunk and (self.running[k] is None or self.running[k].done()):
+                futures[k] = self._submit(k, self._altitudes, chunk)
+        for k, future in futures.items():
+            z[k :: self.num_connections] = future.result()
+        return z
+
+    def launch(self, names, timeout=30.0, clock=None, poll=0.1):
+        """Launch the named vehicles and return those not airborne after timeout."""
+        names = list(names)
+        clock = clock if clock is not None else WallClock()
+        deadline = clock.now() + timeout
+        futures = [
+            self._submit(k, self._launch_chunk, names[k :: self.num_connections])
+            for k in range(self.num_connections)
+            if names[k :: self.num_connections]
+        ]
+        done, _ = wait(futures, timeout=timeout)
+        for future in done:
+            future.result()
+
+        # Readiness barrier on the altitude every vehicle actually reached
+        while True:
+            ready = self.altitudes(names) <= self.altitude + self.tolerance
+            if ready.all() or clock.now() >= deadline:
+                return [name for name, r in zip(names, ready) if not r]
+            clock.sleep(poll)
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False)
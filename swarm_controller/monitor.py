@@ -0,0 +1,120 @@
+import numpy as np
+from neighbors import KDTreeIndex
+
+
+def closest_approach(positions, velocities, i, j, horizon):
+    """Time in [0, horizon] and distance of closest approach of the (i, j) pairs.
+
+    Both UAVs of a pair are assumed to keep their current velocity.
+    """
+    r = positions[j] - positions[i]
+    v = velocities[j] - velocities[i]
+    vv = np.einsum("ij,ij->i", v, v)
+    t = -np.einsum("ij,ij->i", r, v) / np.where(vv > 0, vv, 1)
+    t = np.clip(t, 0, horizon)
+    d = np.linalg.norm(r + v * t[:, np.newaxis], axis=1)
+    return t, d
+
+
+class CollisionMonitor(object):
+    """Predict conflicts between neighbouring UAVs from the state snapshot.
+
+    The pairs that could come within safe_distance of each other inside
+    horizon seconds are taken from the neighbour index, or from pairs it
+    already returned, and their time and distance of closest approach are
+    computed in one pass. Pairs already closer than contact_distance count
+    as contacts. No RPC is made, so the statistics cost the same however
+    many UAVs are flying.
+
+    The search radius grows with the fastest UAV and is capped at max_reach.
+    A conflict further away than the cap is picked up on a later check, once
+    the pair has closed in. step() only checks every few calls.
+    """
+
+    def __init__(
+        self,
+        safe_distance=2.0,
+        horizon=2.0,
+        contact_distance=1.0,
+        every=1,
+        max_reach=None,
+    ):
+        self.safe_distance = safe_distance
+        self.horizon = horizon
+        self.contact_distance = contact_distance
+        self.every = max(1, int(every))
+        self.max_reach = max_reach
+        self.calls = 0
+        self.conflicting = np.zeros(0, np.int64)
+        self.stats = {
+            "ticks": 0,
+            "pairs": 0,
+            "conflicts": 0,
+            "events": 0,
+            "contacts": 0,
+            "min_separation": np.inf,
+        }
+
+    def reach(self, velocities):
+        """Largest distance at which two UAVs can still conflict within horizon."""
+        speed = np.linalg.norm(velocities, axis=1).max() if len(velocities) else 0
+        reach = self.safe_distance + 2 * speed * self.horizon
+        return reach if self.max_reach is None else min(reach, self.max_reach)
+
+    def check(self, positions, velocities, index=None, pairs=None):
+        """Return the (i, j, t, d) arrays of the pairs predicted to conflict.
+
+        pairs are (i, j) arrays a neighbour index returned for positions,
+        e.g. the r_max pairs of the flocking terms, and are checked as they
+        are. Otherwise index, already built on positions, is queried, or a
+        KD-tree is built for the call.
+        """
+        positions = np.asarray(positions, dtype=float)
+        velocities = np.asarray(velocities, dtype=float)
+        if pairs is None:
+            if index is None:
+                index = KDTreeIndex()
+                index.build(positions)
+            pairs = index.query_pairs(self.reach(velocities))
+        i, j = pairs
+        # Directed pairs come both ways, keep each pair once
+        i, j = i[i < j], j[i < j]
+        # A pair cannot close in faster than its relative speed
+        r = positions[j] - positions[i]
+        v = velocities[j] - velocities[i]
+        separation = np.sqrt(np.einsum("ij,ij->i", r, r))
+        bound = self.safe_distance + np.sqrt(np.einsum("ij,ij->i", v, v)) * self.horizon
+        near = separation < bound
+        i, j = i[near], j[near]
+
+        t, d = closest_approach(positions, velocities, i, j, self.horizon)
+        conflict = d < self.safe_distance
+
+        # A conflict event starts when a pair enters conflict
+        keys = i[conflict] * len(positions) + j[conflict]
+        events = int(np.count_nonzero(~np.isin(keys, self.conflicting)))
+        self.conflicting = keys
+
+        self.stats["ticks"] += 1
+        self.stats["pairs"] += len(i)
+        self.stats["conflicts"] += len(keys)
+        self.stats["events"] += events
+        self.stats["contacts"] += int(
+            np.count_nonzero(separation < self.contact_distance)
+        )
+        if len(separation):
+            self.stats["min_separation"] = min(
+                self.stats["min_separation"], float(separation.min())
+            )
+        return i[conflict], j[conflict], t[conflict], d[conflict]
+
+    def step(self, positions, velocities, index=None, pairs=None):
+        """check() once every few calls, None on the calls in between."""
+        self.calls += 1
+        if (self.calls - 1) % self.every:
+            return None
+        return self.check(positions, velocities, index, pairs)
+
+    def report(self):
+        """Cumulative counters over every tick checked so far."""
+        return dict(self.stats)
@@ -0,0 +1,182 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class GridIndex(object):
+    """Uniform grid over the swarm with square cells of side cell_size (usually r_max)."""
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.positions = np.zeros((0, 2))
+
+    def build(self, positions):
+        """Bin every UAV into its cell. Call once per control tick."""
+        self.positions = np.asarray(positions, dtype=float)
+        cells = np.floor(self.positions / self.cell_size).astype(np.int64)
+        self.cell_min = cells.min(axis=0) if len(cells) else np.zeros(2, np.int64)
+        cells -= self.cell_min
+        # Leave room for the neighbouring offsets on both sides of the grid
+        self.width = int(cells[:, 1].max()) + 3 if len(cells) else 3
+        self.cells = cells
+        keys = self._key(cells)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def _key(self, cells):
+        return (cells[:, 0] + 1) * self.width + (cells[:, 1] + 1)
+
+    def query_pairs(self, radius):
+        """Return directed pairs (i, j), i != j, closer than radius."""
+        n = len(self.positions)
+        if n < 2:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+        reach = int(np.ceil(radius / self.cell_size))
+        offsets = np.arange(-reach, reach + 1)
+        rows_i, rows_j = [], []
+        for dx in offsets:
+            for dy in offsets:
+                shifted = self.cells + np.array([dx, dy])
+                valid = (shifted >= -1).all(axis=1) & (shifted[:, 1] < self.width - 1)
+                keys = self._key(shifted)
+                start = np.searchsorted(self.sorted_keys, keys, side="left")
+                stop = np.searchsorted(self.sorted_keys, keys, side="right")
+                counts = np.where(valid, stop - start, 0)
+                if counts.sum() == 0:
+                    continue
+                # Expand every [start, stop) range into explicit candidate pairs
+                owner = np.repeat(np.arange(n), counts)
+                first = np.repeat(start - np.cumsum(counts) + counts, counts)
+                slot = np.arange(counts.sum()) + first
+                rows_i.append(owner)
+                rows_j.append(self.order[slot])
+
+        if not rows_i:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        i = np.concatenate(rows_i)
+        j = np.concatenate(rows_j)
+        d = np.linalg.norm(self.positions[j] - self.positions[i], axis=1)
+        keep = (i != j) & (d < radius)
+        return i[keep], j[keep]
+
+
+class KDTreeIndex(object):
+    """KD-tree backed neighbour index, better suited to very uneven swarms."""
+
+    def __init__(self, cell_size=None):
+        self.tree = None
+
+    def build(self, positions):
+        """Rebuild the tree. Call once per control tick."""
+        self.positions = np.asarray(positions, dtype=float)
+        self.tree = cKDTree(self.positions)
+
+    def query_pairs(self, radius):
+        """Return directed pairs (i, j), i != j, closer than radius."""
+        pairs = self.tree.query_pairs(radius, output_type="ndarray")
+        if len(pairs) == 0:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        # query_pairs uses <= radius, the controller uses a strict cutoff
+        d = np.linalg.norm(
+            self.positions[pairs[:, 1]] - self.positions[pairs[:, 0]], axis=1
+        )
+        pairs = pairs[d < radius]
+        i = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        j = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        return i, j
+
+
+class BruteForceIndex(object):
+    """All-pairs reference index, fine for the nine-UAV setup."""
+
+    def __init__(self, cell_size=None):
+        self.positions = np.zeros((0, 2))
+
+    def build(self, positions):
+        self.positions = np.asarray(positions, dtype=float)
+
+    def query_pairs(self, radius):
+        """Return directed pairs (i, j), i != j, closer than radius."""
+        diff = self.positions[np.newaxis, :, :] - self.positions[:, np.newaxis, :]
+        distances = np.sqrt((diff**2).sum(axis=-1))
+        np.fill_diagonal(distances, np.inf)
+        return np.nonzero(distances < radius)
+
+
+class VerletList(object):
+    """Neighbour list of an index, cached between ticks with a skin margin.
+
+    The pairs closer than cutoff + skin are listed once, and build() only
+    lists them again once some UAV moved more than skin / 2 since then. Until
+    that happens the list holds every pair closer than cutoff, so a query
+    only filters the cached pairs by their current distance. Larger radii
+    are answered by the wrapped index itself, built again for them, and
+    counted in fallbacks.
+    """
+
+    def __init__(self, index, cutoff, skin=2.0):
+        self.index = index
+        self.cutoff = float(cutoff)
+        self.skin = float(skin)
+        self.radius = self.cutoff + self.skin
+        self.reference = None
+        self.displacement = 0.0
+        self.indexed = False
+        self.rebuilds = 0
+        self.builds = 0
+        self.fallbacks = 0
+
+    def build(self, positions):
+        """Track the new positions, listing the pairs again only when needed."""
+        self.positions = np.asarray(positions, dtype=float)
+        self.builds += 1
+        self.indexed = False
+        if self.reference is not None and len(self.reference) == len(self.positions):
+            self.displacement = np.sqrt(
+                ((self.positions - self.reference) ** 2).sum(axis=1).max(initial=0)
+            )
+            if self.displacement <= self.skin / 2:
+                return
+
+        self.index.build(self.positions)
+        self.indexed = True
+        # Keep each pair once, queries return both directions
+        i, j = self.index.query_pairs(self.radius)
+        self.i, self.j = i[i < j], j[i < j]
+        self.reference = self.positions.copy()
+        self.displacement = 0.0
+        self.rebuilds += 1
+
+    def query_pairs(self, radius):
+        """Return directed pairs (i, j), i != j, closer than radius."""
+        # Two UAVs closed in by at most twice the largest displacement
+        if radius + 2 * self.displacement > self.radius:
+            self.fallbacks += 1
+            if not self.indexed:
+                self.index.build(self.positions)
+                self.indexed = True
+            return self.index.query_pairs(radius)
+        r_ij = self.positions[self.j] - self.positions[self.i]
+        keep = np.einsum("ij,ij->i", r_ij, r_ij) < radius**2
+        i, j = self.i[keep], self.j[keep]
+        return np.concatenate([i, j]), np.concatenate([j, i])
+
+
+NEIGHBOR_INDEXES = {
+    "grid": GridIndex,
+    "kdtree": KDTreeIndex,
+    "brute": BruteForceIndex,
+}
+
+
+def make_index(kind, cell_size, skin=None):
+    """Create the neighbour index registered under kind.
+
+    With a skin the index is wrapped in a VerletList whose cutoff is cell_size.
+    """
+    if kind not in NEIGHBOR_INDEXES:
+        raise ValueError(f"Unknown neighbor index: {kind}")
+    if skin:
+        # Cells as large as the listed radius keep a rebuild to one ring of cells
+        return VerletList(NEIGHBOR_INDEXES[kind](cell_size + skin), cell_size, skin)
+    return NEIGHBOR_INDEXES[kind](cell_size)
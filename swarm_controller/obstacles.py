@@ -0,0 +1,114 @@
+import json
+import numpy as np
+
+
+def box_distance(points, box):
+    """Signed distance from (..., 2) points to a box ((x_min, x_max), (y_min, y_max))."""
+    (x0, x1), (y0, y1) = box
+    center = np.array([(x0 + x1) / 2, (y0 + y1) / 2])
+    half = np.array([abs(x1 - x0) / 2, abs(y1 - y0) / 2])
+    d = np.abs(points - center) - half
+    outside = np.linalg.norm(np.maximum(d, 0), axis=-1)
+    inside = np.minimum(d.max(axis=-1), 0)
+    return outside + inside
+
+
+def circle_distance(points, center, radius=0):
+    """Signed distance from (..., 2) points to a circle, radius 0 for a point."""
+    return np.linalg.norm(points - np.asarray(center), axis=-1) - radius
+
+
+class ObstacleField(object):
+    """Static obstacle map sampled from a precomputed signed-distance grid.
+
+    Boxes use the ((x_min, x_max), (y_min, y_max)) layout of the mission
+    scripts and circles are ((x, y), radius) or bare (x, y) points. The
+    distance is evaluated exactly once per grid node, only within cutoff of
+    each obstacle, and saturates at cutoff elsewhere. Each tick then costs
+    one bilinear lookup for the whole swarm however many obstacles there are.
+    """
+
+    def __init__(self, boxes=(), circles=(), resolution=0.5, cutoff=20, bounds=None):
+        self.boxes = [tuple(map(tuple, box)) for box in boxes]
+        self.circles = [
+            (tuple(c), 0.0) if np.isscalar(c[0]) else (tuple(c[0]), float(c[1]))
+            for c in circles
+        ]
+        self.resolution = resolution
+        self.cutoff = cutoff
+
+        extents = [
+            (min(box[0]), min(box[1]), max(box[0]), max(box[1])) for box in self.boxes
+        ] + [(x - r, y - r, x + r, y + r) for (x, y), r in self.circles]
+        if bounds is None:
+            # Without obstacles the grid only spans cutoff around the origin,
+            # at free distance everywhere, so the field pushes nowhere
+            extents = np.array(extents or [(0, 0, 0, 0)]).reshape(-1, 4)
+            bounds = (extents[:, :2].min(0) - cutoff, extents[:, 2:].max(0) + cutoff)
+        self.lower = np.asarray(bounds[0], dtype=float)
+        self.shape = (
+            np.ceil((np.asarray(bounds[1]) - self.lower) / resolution).astype(int) + 1
+        )
+
+        distance = np.full(self.shape, float(cutoff))
+        for (x0, y0, x1, y1), obstacle in zip(extents, self.boxes + self.circles):
+            # Only the nodes within cutoff of this obstacle can change
+            lo = np.floor(([x0, y0] - self.lower - cutoff) / resolution).astype(int)
+            hi = np.ceil(([x1, y1] - self.lower + cutoff) / resolution).astype(int) + 1
+            lo, hi = np.maximum(lo, 0), np.minimum(hi, self.shape)
+            if np.any(hi <= lo):
+                continue
+            window = self.nodes(lo, hi)
+            if len(obstacle) == 2 and np.isscalar(obstacle[1]):
+                d = circle_distance(window, *obstacle)
+            else:
+                d = box_distance(window, obstacle)
+            view = distance[lo[0] : hi[0], lo[1] : hi[1]]
+            np.minimum(view, d, out=view)
+
+        gx, gy = np.gradient(distance, resolution)
+        self.table = np.stack([distance, gx, gy], -1)
+
+    @classmethod
+    def from_json(cls, path, **kwargs):
+        """Load {"boxes": [...], "circles": [...]} from a site map file."""
+        with open(path) as file:
+            site = json.load(file)
+        return cls(site.get("boxes", ()), site.get("circles", ()), **kwargs)
+
+    def nodes(self, lo, hi):
+        """World coordinates of the grid nodes in [lo, hi), shape (nx, ny, 2)."""
+        x = self.lower[0] + self.resolution * np.arange(lo[0], hi[0])
+        y = self.lower[1] + self.resolution * np.arange(lo[1], hi[1])
+        return np.stack(np.meshgrid(x, y, indexing="ij"), -1)
+
+    def sample(self, positions):
+        """Bilinear lookup of the (N,) signed distance and (N, 2) gradient."""
+        f = (np.reshape(positions, (-1, 2)) - self.lower) / self.resolution
+        f = np.clip(f, 0, self.shape - 1.000001)
+        i = f.astype(int)
+        w = (f - i)[:, :, np.newaxis]
+        t = self.table
+        values = (1 - w[:, 0]) * (
+            (1 - w[:, 1]) * t[i[:, 0], i[:, 1]] + w[:, 1] * t[i[:, 0], i[:, 1] + 1]
+        ) + w[:, 0] * (
+            (1 - w[:, 1]) * t[i[:, 0] + 1, i[:, 1]]
+            + w[:, 1] * t[i[:, 0] + 1, i[:, 1] + 1]
+        )
+        return values[:, 0], values[:, 1:]
+
+    def repulsion(self, positions, k_obs, feel_distance, per_distance=True):
+        """(N, 2) push away from the nearest obstacle surface within feel_distance.
+
+        k_obs * (feel - d) / d along the outward normal, with d floored at one
+        grid cell, as in circle_move_with_obstacles. cover_block and
+        spiral_motion push k_obs * (feel - d) instead (per_distance=False).
+        """
+        distance, gradient = self.sample(positions)
+        norm = np.linalg.norm(gradient, axis=1, keepdims=True)
+        normal = np.divide(gradient, norm, out=np.zeros_like(gradient), where=norm > 0)
+        d = np.maximum(distance, self.resolution)[:, np.newaxis]
+        gain = np.where(distance[:, np.newaxis] < feel_distance, feel_distance - d, 0)
+        if per_distance:
+            gain = gain / d
+        return k_obs * gain * normal
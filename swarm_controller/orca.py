@@ -0,0 +1,256 @@
+import numpy as np
+from neighbors import KDTreeIndex
+
+EPSILON = 1e-9
+
+
+def det(a, b):
+    """2D cross product of (..., 2) arrays."""
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def orca_lines(positions, velocities, i, j, radius, horizon, period):
+    """Half-plane of permitted velocities of UAV i against neighbour j.
+
+    Returns the (P, 2) points and unit directions of the lines, the permitted
+    side being on the left of each direction. Each UAV takes half of the
+    avoidance effort, as in the RVO2 library.
+    """
+    rel_pos = positions[j] - positions[i]
+    rel_vel = velocities[i] - velocities[j]
+    dist_sq = np.einsum("ij,ij->i", rel_pos, rel_pos)
+    r = 2 * radius
+    r_sq = r**2
+    colliding = dist_sq <= r_sq
+
+    # Vector from the cutoff center to the relative velocity, using the time
+    # step instead of the horizon for pairs that already overlap
+    inv_time = np.where(colliding, 1 / period, 1 / horizon)[:, np.newaxis]
+    w = rel_vel - inv_time * rel_pos
+    w_len_sq = np.einsum("ij,ij->i", w, w)
+    w_len = np.sqrt(w_len_sq)
+    unit_w = w / np.maximum(w_len, EPSILON)[:, np.newaxis]
+    dot = np.einsum("ij,ij->i", w, rel_pos)
+
+    # Project on the cutoff circle
+    cutoff = colliding | ((dot < 0) & (dot**2 > r_sq * w_len_sq))
+    direction = np.stack([unit_w[:, 1], -unit_w[:, 0]], 1)
+    u = (r * inv_time[:, 0] - w_len)[:, np.newaxis] * unit_w
+
+    # Or on the left or right leg of the velocity obstacle
+    leg = np.sqrt(np.maximum(dist_sq - r_sq, 0))
+    x, y = rel_pos[:, 0], rel_pos[:, 1]
+    left = det(rel_pos, w) > 0
+    leg_direction = (
+        np.where(
+            left[:, np.newaxis],
+            np.stack([x * leg - y * r, x * r + y * leg], 1),
+            -np.stack([x * leg + y * r, -x * r + y * leg], 1),
+        )
+        / np.maximum(dist_sq, EPSILON)[:, np.newaxis]
+    )
+    leg_u = (
+        np.einsum("ij,ij->i", rel_vel, leg_direction)[:, np.newaxis] * leg_direction
+        - rel_vel
+    )
+    direction = np.where(cutoff[:, np.newaxis], direction, leg_direction)
+    u = np.where(cutoff[:, np.newaxis], u, leg_u)
+    return velocities[i] + 0.5 * u, direction
+
+
+def linear_program(points, directions, valid, preferred, v_max, direction_opt=False):
+    """Incremental 2D linear program of every UAV over its (N, K) lines.
+
+    Lines are added one at a time, each new one solved as a 1D problem along
+    it against the previous ones, for all UAVs at once. The result is the
+    velocity closest to preferred, or the one furthest along the unit
+    preferred direction with direction_opt. Also returns the (N,) index of
+    the first line that could not be met, K when all were.
+    """
+    count = points.shape[1]
+    if direction_opt:
+        result = preferred * v_max[:, np.newaxis]
+    else:
+        speed = np.linalg.norm(preferred, axis=1)
+        scale = np.where(speed > v_max, v_max / np.maximum(speed, EPSILON), 1.0)
+        result = preferred * scale[:, np.newaxis]
+    fail = np.full(len(preferred), count)
+
+    for k in range(count):
+        p, d = points[:, k], directions[:, k]
+        violated = valid[:, k] & (fail == count) & (det(d, p - result) > 0)
+        if not violated.any():
+            continue
+        idx = np.nonzero(violated)[0]
+        p, d, r = p[idx], d[idx], v_max[idx]
+
+        # Segment of the line inside the speed circle
+        dot = np.einsum("ij,ij->i", p, d)
+        disc = dot**2 + r**2 - np.einsum("ij,ij->i", p, p)
+        ok = disc >= 0
+        sqrt_disc = np.sqrt(np.maximum(disc, 0))
+        t_left, t_right = -dot - sqrt_disc, -dot + sqrt_disc
+
+        # Cut by the previous lines
+        if k:
+            p_prev, d_prev = points[idx, :k], directions[idx, :k]
+            v_prev = valid[idx, :k]
+            denominator = det(d[:, np.newaxis], d_prev)
+            numerator = det(d_prev, p[:, np.newaxis] - p_prev)
+            parallel = np.abs(denominator) <= EPSILON
+            ok &= ~(v_prev & parallel & (numerator < 0)).any(axis=1)
+            t = numerator / np.where(parallel, 1, denominator)
+            right = v_prev & ~parallel & (denominator >= 0)
+            left = v_prev & ~parallel & (denominator < 0)
+            t_right = np.minimum(t_right, np.where(right, t, np.inf).min(axis=1))
+            t_left = np.maximum(t_left, np.where(left, t, -np.inf).max(axis=1))
+            ok &= t_left <= t_right
+
+        if direction_opt:
+            forward = np.einsum("ij,ij->i", d, preferred[idx]) > 0
+            t = np.where(forward, t_right, t_left)
+        else:
+            t = np.einsum("ij,ij->i", d, preferred[idx] - p)
+            t = np.clip(t, t_left, np.maximum(t_left, t_right))
+        result[idx[ok]] = (p + t[:, np.newaxis] * d)[ok]
+        fail[idx[~ok]] = k
+    return result, fail
+
+
+def least_violation(points, directions, valid, result, begin, v_max):
+    """Velocities that least violate the lines from begin on, where none fits.
+
+    Minimizes the largest distance by which a velocity falls outside those
+    lines, keeping every line before begin satisfied, as in the third linear
+    program of the RVO2 library.
+    """
+    distance = np.zeros(len(result))
+    for k in range(points.shape[1]):
+        p, d = points[:, k], directions[:, k]
+        active = valid[:, k] & (k >= begin) & (det(d, p - result) > distance)
+        if not active.any():
+            continue
+        idx = np.nonzero(active)[0]
+        p, d = p[idx, np.newaxis], d[idx, np.newaxis]
+        p_prev, d_prev = points[idx, :k], directions[idx, :k]
+
+        # Lines of the velocities equally far outside line k and each previous one
+        denominator = det(d, d_prev)
+        parallel = np.abs(denominator) <= EPSILON
+        same = parallel & (np.einsum("ijk,ijk->ij", d, d_prev) > 0)
+        t = det(d_prev, p - p_prev) / np.where(parallel, 1, denominator)
+        point = np.where(
+            parallel[..., np.newaxis], 0.5 * (p + p_prev), p + t[..., np.newaxis] * d
+        )
+        direction = d_prev - d
+        norm = np.linalg.norm(direction, axis=-1, keepdims=True)
+        direction = direction / np.maximum(norm, EPSILON)
+
+        # Move as far as possible along the normal of line k
+        normal = np.stack([-d[:, 0, 1], d[:, 0, 0]], 1)
+        projected, fail = linear_program(
+            point, direction, valid[idx, :k] & ~same, normal, v_max[idx], True
+        )
+        ok = fail == k
+        result[idx[ok]] = projected[ok]
+        distance[idx] = det(d[:, 0], p[:, 0] - result[idx])
+    return result
+
+
+def solve_lines(points, directions, valid, preferred, v_max):
+    """Velocity closest to preferred within v_max and every valid half-plane.
+
+    points, directions and valid are (N, K, ...) tables of each UAV's lines.
+    A UAV whose lines cannot all be met, as happens in dense crowds, gets
+    the velocity that least violates them instead and is flagged in the
+    returned (N,) mask.
+    """
+    v_max = np.broadcast_to(np.asarray(v_max, dtype=float), len(preferred))
+    result, fail = linear_program(points, directions, valid, preferred, v_max)
+    failed = fail < points.shape[1]
+    if failed.any():
+        result[failed] = least_violation(
+            points[failed],
+            directions[failed],
+            valid[failed],
+            result[failed],
+            fail[failed],
+            v_max[failed],
+        )
+    return result, failed
+
+
+class OrcaAvoidance(object):
+    """Optimal reciprocal collision avoidance over indexed neighbours.
+
+    Turns the preferred (N, 2) velocities of the swarm into the closest ones
+    that keep every UAV of the given radius clear of its max_neighbors
+    nearest neighbours for horizon seconds, assuming they do their half.
+    Only neighbours within neighbor_dist are considered when it is given.
+    The velocities fed back should be the last commanded ones: UAVs only
+    avoid each other reciprocally if each one flies the velocity it chose.
+    Without them, the ones returned on the previous call are used.
+    Used in place of the repulsion term, so UAVs slow down or sidestep
+    instead of bouncing off each other.
+    """
+
+    def __init__(
+        self, radius=0.9, horizon=2.0, max_neighbors=10, neighbor_dist=None, period=0.1
+    ):
+        self.radius = radius
+        self.horizon = horizon
+        self.max_neighbors = max_neighbors
+        self.neighbor_dist = neighbor_dist
+        self.period = period
+        self.stats = {"ticks": 0, "constraints": 0, "infeasible": 0}
+        self.last = None
+
+    def neighbors(self, positions, v_max, index=None):
+        """(N, K) table of each UAV's nearest neighbours that could be reached."""
+        reach = 2 * self.radius + 2 * v_max * self.horizon
+        if self.neighbor_dist is not None:
+            reach = min(reach, self.neighbor_dist)
+        if index is None:
+            index = KDTreeIndex()
+            index.build(positions)
+        i, j = index.query_pairs(reach)
+        d = np.linalg.norm(positions[j] - positions[i], axis=1)
+        order = np.lexsort((d, i))
+        i, j = i[order], j[order]
+        counts = np.bincount(i, minlength=len(positions))
+        rank = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+        keep = rank < self.max_neighbors
+        table = np.full((len(positions), max(int(counts.max(initial=0)), 1)), -1)
+        table = table[:, : self.max_neighbors]
+        table[i[keep], rank[keep]] = j[keep]
+        return table
+
+    def velocities(self, positions, velocities, preferred, v_max, index=None):
+        """Collision-free (N, 2) velocities closest to the preferred ones."""
+        positions = np.asarray(positions, dtype=float)
+        if velocities is None:
+            velocities = self.last
+            if velocities is None or len(velocities) != len(positions):
+                velocities = np.zeros_like(positions)
+        velocities = np.asarray(velocities, dtype=float)
+        preferred = np.asarray(preferred, dtype=float)
+        table = self.neighbors(positions, v_max, index)
+        valid = table >= 0
+        i = np.repeat(np.arange(len(positions)), table.shape[1])[valid.ravel()]
+        j = table[valid]
+
+        points = np.zeros(table.shape + (2,))
+        directions = np.zeros(table.shape + (2,))
+        points[valid], directions[valid] = orca_lines(
+            positions, velocities, i, j, self.radius, self.horizon, self.period
+        )
+        result, failed = solve_lines(points, directions, valid, preferred, v_max)
+
+        self.stats["ticks"] += 1
+        self.stats["constraints"] += len(i)
+        self.stats["infeasible"] += int(failed.sum())
+        self.last = result
+        return result
+
+    def report(self):
+        return dict(self.stats)
@@ -0,0 +1,180 @@
+import functools
+import hashlib
+import os
+import numpy as np
+from formation_table import formation_slots
+from groups import GroupRegistry
+
+
+# Every entry maps (num_uavs, steps, **params) to a (T, N, 2) table of the
+# reference point of every UAV at every tick of a mission, or to a (T, N, 3)
+# table whose last column is the altitude command when the pattern sets it.
+def circle_path(num_uavs, steps=600, period=600, radius=60, formation_radius=15):
+    # A circle formation whose center goes once around a circle in period ticks
+    angle = 2 * np.pi * np.arange(steps) / period
+    center = radius * np.stack([np.cos(angle), np.sin(angle)], 1)
+    slots = formation_slots("circle", num_uavs, formation_radius)
+    return center[:, np.newaxis] + slots
+
+
+def v_path(num_uavs, steps=600, period=800, radius=70, spacing=8):
+    # A V formation flying around a circle, its tip pointing along the path
+    angle = 2 * np.pi * np.arange(steps) / period
+    center = radius * np.stack([np.cos(angle), np.sin(angle)], 1)
+    c, s = np.cos(angle - np.pi / 2), np.sin(angle - np.pi / 2)
+    rotation = np.stack([np.stack([c, -s], 1), np.stack([s, c], 1)], 1)
+    slots = formation_slots("V", num_uavs, spacing)
+    return center[:, np.newaxis] + np.einsum("tij,nj->tni", rotation, slots)
+
+
+def orbit_path(
+    num_uavs,
+    steps=600,
+    centers=((0, 0),),
+    radius=18,
+    radius_mid=None,
+    turns=0,
+    z=-40,
+    climb=0,
+):
+    # Consecutive UAVs split into one ring per center, as GroupRegistry.by_index.
+    # The radius goes to radius_mid halfway along the path and back, the rings
+    # turn turns times and the altitude rises by climb over the path.
+    groups = GroupRegistry.by_index(num_uavs, len(centers))
+    s = np.arange(steps) / steps
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), groups.num_groups)
+    if radius_mid is not None:
+        mid = np.broadcast_to(np.asarray(radius_mid, dtype=float), groups.num_groups)
+        radius = radius + np.outer(np.sin(np.pi * s), mid - radius)
+    r = np.broadcast_to(radius, (steps, groups.num_groups))[:, groups.labels]
+
+    phase = 2 * np.pi * groups.rank / groups.sizes[groups.labels]
+    angle = phase + 2 * np.pi * turns * s[:, np.newaxis]
+    path = np.empty((steps, num_uavs, 3))
+    path[:, :, :2] = np.asarray(centers, dtype=float)[groups.labels]
+    path[:, :, 0] += r * np.cos(angle)
+    path[:, :, 1] += r * np.sin(angle)
+    path[:, :, 2] = (z - climb * s)[:, np.newaxis]
+    return path
+
+
+def spiral_path(
+    num_uavs, steps=600, centers=((0, 0),), radius=25, radius_mid=18, z=-40, climb=1
+):
+    # Rings that turn once around their center, narrowing then widening again
+    return orbit_path(num_uavs, steps, centers, radius, radius_mid, 1, z, climb)
+
+
+def cover_path(num_uavs, steps=600, centers=((0, 0),), radius=18, z=-40):
+    # Fixed rings, one around each center
+    return orbit_path(num_uavs, steps, centers, radius, z=z)
+
+
+def scan_path(num_uavs, steps=500, distance=60, z=0):
+    # Every UAV moves distance along x over the path, y is left to the caller
+    path = np.zeros((steps, num_uavs, 3))
+    path[:, :, 0] = (distance * np.arange(steps) / steps)[:, np.newaxis]
+    path[:, :, 2] = z
+    return path
+
+
+def grid_scan_path(num_uavs, steps=500, grid_size=30, cell_distance=30, z=0):
+    # Grid offsets around the swarm center, held for steps ticks, then the
+    # same grid mirrored along x for another steps ticks
+    index = np.arange(num_uavs)
+    row, col = index // grid_size, index % grid_size
+    path = np.zeros((2 * steps, num_uavs, 3))
+    path[:steps, :, 0] = cell_distance * (col - grid_size // 2)
+    path[steps:, :, 0] = cell_distance * (grid_size - 1 - col - grid_size // 2)
+    path[:, :, 1] = cell_distance * (row - grid_size // 2)
+    path[:, :, 2] = z
+    return path
+
+
+def ring_path(
+    num_uavs, steps=500, period=500, center=(0, 15), radius=20, spacing=None, z=0
+):
+    # A ring turning once every period ticks, UAVs spacing radians apart
+    # (evenly spread when None)
+    spacing = 2 * np.pi / num_uavs if spacing is None else spacing
+    angle = (
+        spacing * np.arange(num_uavs)
+        + 2 * np.pi * np.arange(steps)[:, np.newaxis] / period
+    )
+    path = np.empty((steps, num_uavs, 3))
+    path[:, :, 0] = center[0] + radius * np.cos(angle)
+    path[:, :, 1] = center[1] + radius * np.sin(angle)
+    path[:, :, 2] = z
+    return path
+
+
+PATHS = {
+    "circle": circle_path,
+    "V": v_path,
+    "orbit": orbit_path,
+    "spiral": spiral_path,
+    "cover": cover_path,
+    "scan": scan_path,
+    "grid_scan": grid_scan_path,
+    "ring": ring_path,
+}
+
+# Reference of each moving mission of VelocityComputation, shared with the
+# gain sweep: path type, parameters and number of ticks.
+MISSION_PATHS = {
+    # A circle of radius 15 whose center goes around a circle of radius 60
+    "circle_search": ("circle", dict(period=600, radius=60, formation_radius=15), 600),
+    # A V of spacing 8 flying around a circle of radius 70
+    "circle_v_search": ("V", dict(period=800, radius=70, spacing=8), 600),
+}
+
+
+def _file_name(type, num_uavs, steps, params):
+    fields = [type, str(num_uavs), str(steps)]
+    for key, value in params:
+        if value is None:
+            value = "none"
+        elif isinstance(value, tuple):
+            # Sequences such as the centers are named by a short digest
+            value = hashlib.md5(repr(value).encode()).hexdigest()[:8]
+        else:
+            value = f"{value:g}"
+        fields.append(key + value)
+    return "_".join(fields) + ".npy"
+
+
+def _freeze(value):
+    # Hashable form of a parameter, nested tuples of floats for sequences
+    if value is None or np.isscalar(value):
+        return value if value is None else float(value)
+    return tuple(_freeze(v) for v in value)
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_path(type, num_uavs, steps, params, cache_dir):
+    file_name = None
+    if cache_dir is not None:
+        file_name = os.path.join(cache_dir, _file_name(type, num_uavs, steps, params))
+        if os.path.exists(file_name):
+            return np.load(file_name, mmap_mode="r")
+
+    table = np.ascontiguousarray(
+        PATHS[type](num_uavs, steps, **dict(params)), dtype=float
+    )
+    if file_name is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(file_name, table)
+    table.setflags(write=False)
+    return table
+
+
+def reference_path(type, num_uavs, steps, cache_dir=None, **params):
+    """Return the (T, N, 2) or (T, N, 3) path of a mission, cached by its parameters.
+
+    With cache_dir the table is also saved there as .npy and memory-mapped
+    by later runs with the same parameters.
+    """
+    if type not in PATHS:
+        raise ValueError(f"Unknown path type: {type}")
+    params = tuple(sorted((key, _freeze(value)) for key, value in params.items()))
+    return _cached_path(type, int(num_uavs), int(steps), params, cache_dir)
@@ -0,0 +1,90 @@
+import numpy as np
+from scipy.spatial.distance import cdist
+from neighbors import KDTreeIndex
+
+
+def intercept_velocity(chasers, targets, target_velocities, speed):
+    """(M, 2) velocities of magnitude speed that intercept (M, 2) moving targets.
+
+    Each target is assumed to keep its velocity. The earliest intercept time
+    solves |r + v t| = speed * t with r the offset to the target. When the
+    target cannot be caught at that speed the chaser heads straight for it.
+    Also returns the (M,) intercept times, inf where there is none.
+    """
+    r = targets - chasers
+    v = target_velocities
+    a = np.einsum("ij,ij->i", v, v) - speed**2
+    b = 2 * np.einsum("ij,ij->i", r, v)
+    c = np.einsum("ij,ij->i", r, r)
+
+    # Roots of a t^2 + b t + c = 0, or of b t + c = 0 when a is zero
+    disc = b**2 - 4 * a * c
+    sqrt_disc = np.sqrt(np.maximum(disc, 0))
+    linear = np.abs(a) < 1e-9
+    safe_a = np.where(linear, 1, a)
+    roots = np.stack(
+        [(-b - sqrt_disc) / (2 * safe_a), (-b + sqrt_disc) / (2 * safe_a)], 1
+    )
+    roots[disc < 0] = np.inf
+    roots[linear] = np.where(b[linear] < 0, -c[linear] / b[linear], np.inf)[
+        :, np.newaxis
+    ]
+    roots[roots < 0] = np.inf
+    t = roots.min(axis=1)
+
+    aim = r + v * np.where(np.isfinite(t), t, 0)[:, np.newaxis]
+    norm = np.linalg.norm(aim, axis=1, keepdims=True)
+    direction = np.divide(aim, norm, out=np.zeros_like(aim), where=norm > 0)
+    return speed * direction, t
+
+
+class PursuitEngine(object):
+    """Intercept commands for M chasers against K targets in one step.
+
+    Every chaser is bound to a target, the nearest one by default or the
+    given (M,) target indices, and flies towards the point where it meets
+    that target if the target keeps its snapshot velocity. Chasers are
+    pushed away from every other UAV closer than safe_distance, twice as
+    hard inside repulsion_distance, as in test.uav_collision.
+    """
+
+    def __init__(
+        self, speed, k_rep=6, safe_distance=5, repulsion_distance=10, assignment=None
+    ):
+        self.speed = speed
+        self.k_rep = k_rep
+        self.safe_distance = safe_distance
+        self.repulsion_distance = repulsion_distance
+        self.assignment = assignment
+        self.index = KDTreeIndex()
+
+    def assign(self, chaser_positions, target_positions):
+        """(M,) index into the targets of the one each chaser pursues."""
+        if self.assignment is not None:
+            return np.asarray(self.assignment)
+        return cdist(chaser_positions, target_positions).argmin(axis=1)
+
+    def repulsion(self, positions, chasers):
+        """(M, 2) push of the chasers away from every UAV within safe_distance."""
+        self.index.build(positions)
+        i, j = self.index.query_pairs(self.safe_distance)
+        r_ij = positions[i] - positions[j]
+        d = np.linalg.norm(r_ij, axis=1)
+        weight = self.k_rep * (self.safe_distance - d) / np.maximum(d, 1e-9)
+        weight = np.where(d < self.repulsion_distance, 2 * weight, weight)
+        v_rep = np.zeros_like(positions)
+        np.add.at(v_rep, i, weight[:, np.newaxis] * r_ij)
+        return v_rep[chasers]
+
+    def velocities(self, positions, velocities, chasers, targets):
+        """(M, 2) commands of the chasers, given (N, 2) snapshot arrays and indices."""
+        positions = np.asarray(positions, dtype=float)
+        velocities = np.asarray(velocities, dtype=float)
+        chasers, targets = np.asarray(chasers), np.asarray(targets)
+        target = targets[self.assign(positions[chasers], positions[targets])]
+        v_chase, _ = intercept_velocity(
+            positions[chasers], positions[target], velocities[target], self.speed
+        )
+        if self.k_rep:
+            v_chase += self.repulsion(positions, chasers)
+        return v_chase
@@ -0,0 +1,91 @@
+import atexit
+import threading
+import numpy as np
+
+
+class TrajectoryRecorder(object):
+    """Stream one row per control tick to an append-only CSV file.
+
+    Rows go into a fixed-size float32 ring buffer and a background thread
+    appends them to disk in chunks, so memory stays constant however long the
+    mission runs. record() never waits on the disk: when the writer falls so
+    far behind that the buffer is full, the row is dropped and counted.
+    """
+
+    def __init__(self, path, num_uavs, width=2, capacity=1024, chunk=64, header=None):
+        self.path = path
+        self.buffer = np.zeros((capacity, num_uavs * width), dtype=np.float32)
+        self.capacity = capacity
+        self.chunk = chunk
+        self.head = 0  # rows recorded so far
+        self.tail = 0  # rows written to disk so far
+        self.dropped = 0
+        self.closed = False
+        self.flushing = False
+        self.cond = threading.Condition()
+
+        self.file = open(path, "w", newline="")
+        if header is not None:
+            self.file.write(",".join(header) + "\n")
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, values):
+        """Append one row, e.g. the (N, 2) positions of this tick."""
+        with self.cond:
+            if self.head - self.tail >= self.capacity:
+                self.dropped += 1
+                return False
+            self.buffer[self.head % self.capacity] = np.ravel(values)
+            self.head += 1
+            if self.head - self.tail >= self.chunk:
+                self.cond.notify()
+        return True
+
+    def _writer(self):
+        while True:
+            with self.cond:
+                while self.head - self.tail < self.chunk and not (
+                    self.closed or self.flushing
+                ):
+                    self.cond.wait()
+                start, stop = self.tail, self.head
+                if start == stop:
+                    self.flushing = False
+                    self.cond.notify_all()
+                    if self.closed:
+                        return
+                    continue
+            # Rows in [start, stop) are not overwritten until tail moves past them
+            first, last = start % self.capacity, stop % self.capacity
+            if first < last:
+                rows = self.buffer[first:last]
+            else:
+                rows = np.concatenate([self.buffer[first:], self.buffer[:last]])
+            np.savetxt(self.file, rows, delimiter=",", fmt="%.6g")
+            self.file.flush()
+            with self.cond:
+                self.tail = stop
+                self.cond.notify_all()
+
+    def flush(self):
+        """Block until every recorded row is on disk."""
+        with self.cond:
+            target = self.head
+            # Ask the writer to take the partial chunk as well
+            self.flushing = True
+            self.cond.notify_all()
+            while self.tail < target and self.thread.is_alive():
+                self.cond.wait()
+
+    def close(self):
+        """Write out the remaining rows and close the file."""
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        self.file.close()
+        atexit.unregister(self.close)
@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+import numpy as np
+
+SETTINGS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "settings.json"
+)
+
+
+def settings_path():
+    """settings.json of the current run, overridden with HGIC_SETTINGS."""
+    return os.environ.get("HGIC_SETTINGS", SETTINGS)
+
+
+class VehicleRegistry(object):
+    """Names, indices and spawn origins of every vehicle in the swarm.
+
+    names[i] is the name of UAV i, index maps a name back to i and
+    origins is an (N, 3) array of spawn points, so every lookup is O(1)
+    whatever the size of the swarm.
+    """
+
+    def __init__(self, names, origins):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.origins = np.zeros((len(self.names), 3))
+        self.origins[:, : np.shape(origins)[1]] = origins
+
+    @classmethod
+    def from_settings(cls, path=None):
+        """Load the vehicles of an AirSim settings.json in file order."""
+        with open(path or settings_path()) as file:
+            vehicles = json.load(file)["Vehicles"]
+        origins = [
+            [v.get("X", 0), v.get("Y", 0), v.get("Z", 0)] for v in vehicles.values()
+        ]
+        return cls(vehicles, origins)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def origin_x(self):
+        return self.origins[:, 0]
+
+    @property
+    def origin_y(self):
+        return self.origins[:, 1]
+
+    def origin(self, vehicle_name):
+        """(2,) horizontal spawn point of the named vehicle."""
+        return self.origins[self.index[vehicle_name], :2]
+
+
+def generate_settings(num_uavs, path=None, spacing=2.0, template=SETTINGS):
+    """Write a settings.json spawning num_uavs vehicles on a square grid.
+
+    Everything but the vehicles is copied from the template, and every
+    vehicle uses the fields of the template's first one.
+    """
+    with open(template) as file:
+        settings = json.load(file)
+    vehicle = dict(next(iter(settings["Vehicles"].values())))
+
+    cols = int(np.ceil(np.sqrt(num_uavs)))
+    settings["Vehicles"] = {}
+    for i in range(num_uavs):
+        vehicle.update(X=(i % cols) * spacing, Y=(i // cols) * spacing, Z=0)
+        settings["Vehicles"]["UAV" + str(i + 1)] = dict(vehicle)
+
+    if path is not None:
+        with open(path, "w") as file:
+            json.dump(settings, file, indent=4)
+    return settings
+
+
+if __name__ == "__main__":
+    # e.g. python registry.py 100 settings_100.json
+    generate_settings(int(sys.argv[1]), sys.argv[2])
@@ -0,0 +1,103 @@
+import collections
+import math
+import time
+import numpy as np
+
+
+class WallClock(object):
+    """Real time clock used by the scheduler on the live system."""
+
+    def now(self):
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class LockStepClock(object):
+    """Simulated clock that only moves when the scheduler waits for a tick.
+
+    The simulation is paused and every sleep advances it by exactly that much
+    simulated time with simContinueForTime, so a run does not depend on how
+    long each tick took to compute. This works with the headless simulator
+    and with AirSim, whose continue-for-time call returns before the
+    simulation has paused again.
+    """
+
+    def __init__(self, client, poll=0.001):
+        self.client = client
+        self.poll = poll
+        self.time = 0.0
+        self.client.simPause(True)
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        self.client.simContinueForTime(seconds)
+        while not self.client.simIsPause():
+            time.sleep(self.poll)
+        self.time += seconds
+
+
+class TickScheduler(object):
+    """Pace a control loop at a fixed rate and account for overruns and jitter.
+
+    Tick k is released at start + k * period. A tick that runs past the next
+    release counts as an overrun and the missed releases are skipped, so the
+    loop never tries to catch up with a burst of back-to-back ticks.
+    """
+
+    def __init__(self, rate=10, clock=None, history=10000):
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.clock = clock if clock is not None else WallClock()
+        self.durations = collections.deque(maxlen=history)
+        self.jitter = collections.deque(maxlen=history)
+        self.ticks_run = 0
+        self.overruns = 0
+        self.skipped = 0
+
+    def ticks(self, n):
+        """Yield tick indices 0..n-1, each released on the fixed-rate grid."""
+        release = self.clock.now()
+        for t in range(n):
+            self.clock.sleep(release - self.clock.now())
+            begin = self.clock.now()
+            self.jitter.append(begin - release)
+
+            yield t
+
+            end = self.clock.now()
+            self.durations.append(end - begin)
+            self.ticks_run += 1
+            release += self.period
+            if end > release:
+                # Overran the period: skip every release we already missed
+                missed = math.ceil((end - release) / self.period)
+                self.overruns += 1
+                self.skipped += missed
+                release += missed * self.period
+
+    def percentiles(self, q=(50, 90, 99)):
+        """Tick durations in seconds at the requested percentiles."""
+        if not self.durations:
+            return {p: 0.0 for p in q}
+        values = np.percentile(np.asarray(self.durations), q)
+        return dict(zip(q, values.tolist()))
+
+    def report(self):
+        """Summary of the loop timing since the scheduler was created."""
+        jitter = np.abs(np.asarray(self.jitter)) if self.jitter else np.zeros(1)
+        return {
+            "rate": self.rate,
+            "ticks": self.ticks_run,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter_mean": float(jitter.mean()),
+            "jitter_max": float(jitter.max()),
+            "duration_percentiles": self.percentiles(),
+        }
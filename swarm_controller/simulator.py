@@ -0,0 +1,292 @@
+import os
+import threading
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from registry import VehicleRegistry
+
+
+class Vector3r(object):
+    """Minimal stand-in for airsim.Vector3r."""
+
+    def __init__(self, x_val=0.0, y_val=0.0, z_val=0.0):
+        self.x_val = x_val
+        self.y_val = y_val
+        self.z_val = z_val
+
+
+class KinematicsState(object):
+    def __init__(self, position, linear_velocity):
+        self.position = position
+        self.linear_velocity = linear_velocity
+
+
+class MultirotorState(object):
+    def __init__(self, kinematics):
+        self.kinematics_estimated = kinematics
+
+
+class CollisionInfo(object):
+    def __init__(self, has_collided=False, object_name="", position=None):
+        self.has_collided = has_collided
+        self.object_name = object_name
+        self.position = position if position is not None else Vector3r()
+
+
+class SimFuture(object):
+    """Returned by the *Async calls, join() waits until the command completes."""
+
+    def __init__(self, world, done_time):
+        self.world = world
+        self.done_time = done_time
+
+    def join(self):
+        # A paused world only moves in lock-step, so there is nothing to wait for
+        if not self.world.paused:
+            self.world.wait_until(self.done_time)
+
+
+class SimWorld(object):
+    """Vectorized point-mass model of a multirotor swarm.
+
+    Positions are kept per vehicle relative to its spawn point, exactly like
+    AirSim reports them, in NED coordinates. Horizontal velocity follows the
+    commanded velocity with a first-order lag and drops to hover when the
+    command duration expires. Altitude moves towards its target at a bounded
+    vertical speed.
+    """
+
+    def __init__(
+        self,
+        names,
+        origins,
+        tau=0.3,
+        max_step=0.02,
+        clock_speed=1.0,
+        collision_radius=0.5,
+        climb_rate=3.0,
+    ):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.origins = np.zeros((n, 3))
+        self.origins[:, : np.shape(origins)[1]] = origins
+        self.tau = tau
+        self.max_step = max_step
+        self.clock_speed = clock_speed
+        self.collision_radius = collision_radius
+        self.climb_rate = climb_rate
+        self.lock = threading.RLock()
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, path=None, **kwargs):
+        """Spawn the vehicles listed in an AirSim settings.json."""
+        registry = VehicleRegistry.from_settings(path)
+        return cls(registry.names, registry.origins, **kwargs)
+
+    @classmethod
+    def grid(cls, num_uavs, spacing=3.0, **kwargs):
+        """Spawn num_uavs vehicles named UAV1..UAVn on a square grid."""
+        cols = int(np.ceil(np.sqrt(num_uavs)))
+        index = np.arange(num_uavs)
+        origins = np.stack([index // cols, index % cols], 1) * spacing
+        names = ["UAV" + str(i + 1) for i in range(num_uavs)]
+        return cls(names, origins, **kwargs)
+
+    def reset(self):
+        with self.lock:
+            n = len(self.names)
+            self.time = 0.0
+            self.paused = False
+            self.wall_time = time.perf_counter()
+            self.position = np.zeros((n, 3))
+            self.velocity = np.zeros((n, 3))
+            self.cmd_velocity = np.zeros((n, 2))
+            self.cmd_until = np.zeros(n)
+            self.z_target = np.zeros(n)
+            self.z_rate = np.full(n, self.climb_rate)
+            self.api_control = np.zeros(n, dtype=bool)
+            self.armed = np.zeros(n, dtype=bool)
+            self.collided = np.zeros(n, dtype=bool)
+            self.collided_with = np.full(n, -1)
+            self.collision_time = -1.0
+
+    def step(self, dt):
+        """Advance every vehicle by dt seconds of simulated time."""
+        with self.lock:
+            while dt > 1e-12:
+                h = min(dt, self.max_step)
+                self._integrate(h)
+                dt -= h
+
+    def _integrate(self, h):
+        active = self.cmd_until > self.time
+        target = np.where(active[:, np.newaxis], self.cmd_velocity, 0.0)
+        alpha = 1.0 - np.exp(-h / self.tau)
+        self.velocity[:, :2] += (target - self.velocity[:, :2]) * alpha
+
+        dz = self.z_target - self.position[:, 2]
+        self.velocity[:, 2] = np.clip(dz / h, -self.z_rate, self.z_rate)
+
+        self.position += self.velocity * h
+        self.time += h
+
+    def sync(self):
+        """Catch simulated time up with the wall clock, scaled by clock_speed."""
+        with self.lock:
+            now = time.perf_counter()
+            elapsed = (now - self.wall_time) * self.clock_speed
+            self.wall_time = now
+            if not self.paused:
+                self.step(elapsed)
+
+    def pause(self, is_paused):
+        with self.lock:
+            self.sync()
+            self.paused = is_paused
+
+    def wait_until(self, sim_time):
+        """Block until the simulated clock reaches sim_time."""
+        while True:
+            with self.lock:
+                self.sync()
+                remaining = sim_time - self.time
+            if remaining <= 0:
+                return
+            time.sleep(remaining / self.clock_speed)
+
+    def world_positions(self):
+        return self.position + self.origins
+
+    def update_collisions(self):
+        """Flag every vehicle that is within collision_radius of another one."""
+        with self.lock:
+            if self.collision_time == self.time:
+                return
+            self.collision_time = self.time
+            pairs = cKDTree(self.world_positions()).query_pairs(
+                2 * self.collision_radius, output_type="ndarray"
+            )
+            self.collided[pairs[:, 0]] = True
+            self.collided[pairs[:, 1]] = True
+            self.collided_with[pairs[:, 0]] = pairs[:, 1]
+            self.collided_with[pairs[:, 1]] = pairs[:, 0]
+
+
+class SimulatedClient(object):
+    """The subset of airsim.MultirotorClient the swarm controller uses."""
+
+    def __init__(self, world=None):
+        self.world = world if world is not None else shared_world()
+
+    def _index(self, vehicle_name):
+        return self.world.index[vehicle_name]
+
+    def confirmConnection(self):
+        print("Connected to the headless swarm simulator")
+
+    def reset(self):
+        self.world.reset()
+
+    def simPause(self, is_paused):
+        self.world.pause(is_paused)
+
+    def simIsPause(self):
+        return self.world.paused
+
+    def simContinueForTime(self, seconds):
+        # Stepping is synchronous, the world is paused again when this returns
+        self.world.step(seconds)
+
+    def enableApiControl(self, is_enabled, vehicle_name=""):
+        self.world.api_control[self._index(vehicle_name)] = is_enabled
+
+    def armDisarm(self, arm, vehicle_name=""):
+        self.world.armed[self._index(vehicle_name)] = arm
+        return True
+
+    def simGetGroundTruthKinematics(self, vehicle_name=""):
+        world = self.world
+        with world.lock:
+            world.sync()
+            i = self._index(vehicle_name)
+            p = world.position[i]
+            v = world.velocity[i]
+            return KinematicsState(Vector3r(*p), Vector3r(*v))
+
+    def getMultirotorState(self, vehicle_name=""):
+        return MultirotorState(self.simGetGroundTruthKinematics(vehicle_name))
+
+    def simGetCollisionInfo(self, vehicle_name=""):
+        world = self.world
+        with world.lock:
+            world.sync()
+            world.update_collisions()
+            i = self._index(vehicle_name)
+            if not world.collided[i]:
+                return CollisionInfo()
+            other = world.collided_with[i]
+            return CollisionInfo(
+                True, world.names[other], Vector3r(*world.world_positions()[i])
+            )
+
+    def moveByVelocityZAsync(self, vx, vy, z, duration, vehicle_name="", **kwargs):
+        world = self.world
+        with world.lock:
+            world.sync()
+            i = self._index(vehicle_name)
+            world.cmd_velocity[i] = (vx, vy)
+            world.cmd_until[i] = world.time + duration
+            world.z_target[i] = z
+            world.z_rate[i] = world.climb_rate
+            return SimFuture(world, world.time + duration)
+
+    def moveByVelocityAsync(self, vx, vy, vz, duration, vehicle_name="", **kwargs):
+        world = self.world
+        with world.lock:
+            world.sync()
+            i = self._index(vehicle_name)
+            return self.moveByVelocityZAsync(
+                vx, vy, world.position[i, 2] + vz * duration, duration, vehicle_name
+            )
+
+    def moveToZAsync(self, z, velocity, vehicle_name="", **kwargs):
+        world = self.world
+        with world.lock:
+            world.sync()
+            i = self._index(vehicle_name)
+            world.z_target[i] = z
+            world.z_rate[i] = abs(velocity)
+            eta = abs(z - world.position[i, 2]) / max(abs(velocity), 1e-6)
+            return SimFuture(world, world.time + eta)
+
+    def takeoffAsync(self, timeout_sec=20, vehicle_name=""):
+        return self.moveToZAsync(-3.0, 1.0, vehicle_name=vehicle_name)
+
+
+_shared_world = None
+
+
+def shared_world():
+    """World shared by every simulated client of this process."""
+    global _shared_world
+    if _shared_world is None:
+        _shared_world = SimWorld.from_settings()
+    return _shared_world
+
+
+def set_shared_world(world):
+    """Replace the shared world, e.g. with a large SimWorld.grid swarm."""
+    global _shared_world
+    _shared_world = world
+
+
+def make_client(backend=None):
+    """Create an RPC client for the configured backend ("airsim" or "sim")."""
+    backend = backend or os.environ.get("HGIC_BACKEND", "airsim")
+    if backend == "sim":
+        return SimulatedClient()
+    import airsim
+
+    return airsim.MultirotorClient()
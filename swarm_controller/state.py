@@ -0,0 +1,54 @@
+import time
+import numpy as np
+
+
+class SwarmState(object):
+    """Kinematics of every UAV, fetched once per control tick.
+
+    positions and velocities are contiguous (N, 2) arrays in the shared swarm
+    frame (the spawn origin of each vehicle is already added), altitudes is the
+    (N,) array of NED z values.
+    """
+
+    def __init__(self, names, origin):
+        self.names = list(names)
+        self.origin = np.asarray(origin, dtype=float)[: len(self.names), :2]
+        n = len(self.names)
+        self.positions = np.zeros((n, 2))
+        self.velocities = np.zeros((n, 2))
+        self.altitudes = np.zeros(n)
+        self.timestamp = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def update(self, client):
+        """Refresh the snapshot with exactly one kinematics RPC per vehicle."""
+        raw = np.empty((len(self.names), 5))
+        for i, name in enumerate(self.names):
+            state = client.simGetGroundTruthKinematics(vehicle_name=name)
+            raw[i] = (
+                state.position.x_val,
+                state.position.y_val,
+                state.position.z_val,
+                state.linear_velocity.x_val,
+                state.linear_velocity.y_val,
+            )
+        self.positions[:] = raw[:, :2] + self.origin
+        self.altitudes[:] = raw[:, 2]
+        self.velocities[:] = raw[:, 3:]
+        self.timestamp = time.time()
+        return self
+
+    @property
+    def center(self):
+        """Center of the swarm as a (2, 1) array, like get_swarm_center."""
+        return self.positions.mean(axis=0).reshape(2, 1)
+
+    @property
+    def avg_altitude(self):
+        return float(self.altitudes.mean())
+
+    def position(self, i):
+        """Position of UAV i as a (2, 1) array, like get_UAV_pos."""
+        return self.positions[i].reshape(2, 1).copy()
@@ -0,0 +1,144 @@
+import csv
+import itertools
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from configuration import GAIN_PROFILES
+from ensemble import EnsembleRun, ensemble_metrics
+from formation_table import formation_slots
+from paths import MISSION_PATHS, reference_path
+from registry import VehicleRegistry, generate_settings
+
+# How each behaviour is flown on the local simulator: the formation slots or
+# mission path it tracks, the repulsion distance, the number of ticks and
+# the force law of EnsembleRun.formation_tick. Formations use the arguments
+# FormationController passes to form_*, the missions those of
+# circle_move_circle and V_move_circle.
+SCENARIOS = {
+    "circle": ("formation", dict(type="circle", spacing=17), 10, 700, {}),
+    "line": ("formation", dict(type="line", spacing=17), 13, 800, {}),
+    "grid": ("formation", dict(type="grid", spacing=5), 13, 500, {}),
+    "slanted_line": ("formation", dict(type="slanted_line", spacing=8), 13, 500, {}),
+    "V": ("formation", dict(type="V", spacing=8), 10, 700, {}),
+    "diagonal": ("formation", dict(type="diagonal", spacing=10), 13, 600, {}),
+    # Unclamped, and without slot assignment for the circle
+    "circle_search": ("mission", {}, 10, None, dict(assign=False, clamp=False)),
+    # Unclamped with twice the repulsion
+    "circle_v_search": ("mission", {}, 8, None, dict(rep_gain=2, clamp=False)),
+}
+
+
+def grid_space(space):
+    """Every combination of a {gain: [values]} grid, as a list of dicts."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*space.values())]
+
+
+def random_space(space, samples, seed=0):
+    """samples draws of a {gain: (low, high)} box, uniform in each gain."""
+    rng = np.random.default_rng(seed)
+    return [
+        {key: float(rng.uniform(*bounds)) for key, bounds in space.items()}
+        for _ in range(samples)
+    ]
+
+
+def fleet_origins(num_uavs=None):
+    """(N, 2) spawn points: settings.json, or a generated grid of num_uavs."""
+    if num_uavs is None:
+        return VehicleRegistry.from_settings().origins[:, :2]
+    vehicles = generate_settings(num_uavs)["Vehicles"].values()
+    return np.array([[v["X"], v["Y"]] for v in vehicles], dtype=float)
+
+
+def scenario_path(behaviour, num_uavs):
+    """(T, N, 2) reference, repulsion distance and force law of a behaviour."""
+    if behaviour not in SCENARIOS:
+        raise ValueError(f"No local scenario for behaviour: {behaviour}")
+    kind, params, rep_dis, steps, law = SCENARIOS[behaviour]
+    if kind == "formation":
+        slots = formation_slots(params["type"], num_uavs, params["spacing"])
+        return np.broadcast_to(slots, (steps,) + slots.shape), rep_dis, law
+    type, params, steps = MISSION_PATHS[behaviour]
+    return reference_path(type, num_uavs, steps, **params), rep_dis, law
+
+
+def run_case(
+    behaviour,
+    gains,
+    num_uavs=None,
+    batch=8,
+    spread=0.5,
+    noise=0.2,
+    seed=0,
+    avoidance=None,
+):
+    """Fly batch perturbed starts with one gain set and summarize the runs."""
+    origins = fleet_origins(num_uavs)
+    path, rep_dis, law = scenario_path(behaviour, len(origins))
+    ensemble = EnsembleRun.perturbed(
+        origins, batch, spread, seed, noise=noise, avoidance=avoidance
+    )
+    ensemble.set_parameters(**gains)
+    metrics = ensemble_metrics(
+        ensemble.run_path(path, rep_dis, **law), ensemble.targets
+    )
+
+    converged = np.isfinite(metrics["convergence_time"])
+    result = dict(gains)
+    result["converged"] = float(converged.mean())
+    result["convergence_time"] = float(np.median(metrics["convergence_time"]))
+    result["final_error"] = float(np.median(metrics["final_error"]))
+    result["min_separation"] = float(metrics["min_separation"].min())
+    result["path_length"] = float(metrics["path_length"].mean())
+    return result
+
+
+def sweep(behaviour, candidates, workers=None, **kwargs):
+    """Evaluate gain overrides of a behaviour's profile over a process pool.
+
+    candidates is a list of {gain: value} dicts, e.g. from grid_space or
+    random_space. Results come back best first: most runs converged, then
+    fastest convergence, then smallest final error, then widest separation.
+    """
+    cases = [dict(GAIN_PROFILES[behaviour], **candidate) for candidate in candidates]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_case, behaviour, gains, **kwargs) for gains in cases]
+        results = [future.result() for future in futures]
+    return sorted(
+        results,
+        key=lambda r: (
+            -r["converged"],
+            r["convergence_time"],
+            r["final_error"],
+            -r["min_separation"],
+        ),
+    )
+
+
+def write_results(results, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+if __name__ == "__main__":
+    # e.g. python sweep.py circle k_sep=5,10,15 k_coh=0.05,0.1 uavs=30
+    #      python sweep.py circle k_sep=5:20 k_rep=10:40 samples=32
+    #      python sweep.py circle v_max=10,20,40 avoidance=orca
+    behaviour, options = sys.argv[1], dict(a.split("=") for a in sys.argv[2:])
+    num_uavs = int(options.pop("uavs")) if "uavs" in options else None
+    samples = int(options.pop("samples", 0))
+    avoidance = options.pop("avoidance", None)
+    if samples:
+        space = {k: tuple(map(float, v.split(":"))) for k, v in options.items()}
+        candidates = random_space(space, samples)
+    else:
+        space = {k: [float(x) for x in v.split(",")] for k, v in options.items()}
+        candidates = grid_space(space)
+
+    results = sweep(behaviour, candidates, num_uavs=num_uavs, avoidance=avoidance)
+    write_results(results, f"sweep_{behaviour}.csv")
+    for result in results[:5]:
+        print({k: round(v, 3) for k, v in result.items()})
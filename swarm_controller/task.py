@@ -13,53 +13,31 @@ class TaskControl(object):
     def circle_search(self):
         """Configure parameters and perform circle search using drones."""
 
-        self.control.set_parameters(
-            v_max=10,
-            r_max=20,
-            k_mig=0.5,
-            k_rep=25,
-            k_sep=0.3,
-            k_coh=0.02,
-        )
+        self.control.set_parameters(**self.control.config.gains("circle_search"))
         self.control.circle_move_circle()
 
     def circle_v_search(self):
         """Configure parameters and perform a V-patterned circle search using drones."""
 
-        self.control.set_parameters(
-            v_max=5,
-            r_max=30,
-            k_mig=0.4,
-            k_rep=30,
-            k_sep=1,
-            k_coh=0,
-        )
+        self.control.set_parameters(**self.control.config.gains("circle_v_search"))
         self.control.V_move_circle()
 
     def line_search(self):
         """Configure parameters and perform a linear search using drones."""
 
-        self.control.set_parameters(
-            v_max=20,
-            r_max=25,
-            k_mig=0.08,
-            k_rep=25,
-            k_sep=1,
-            k_coh=0.1,
-        )
+        self.control.set_parameters(**self.control.config.gains("line_search"))
         self.control.line_search()
 
+    def split_search(self):
+        """Configure parameters and fly three sub-swarms around a circle."""
+
+        self.control.set_parameters(**self.control.config.gains("split_search"))
+        self.control.split_move_circle(3)
+
     def cover(self):
         """Configure parameters and make drones occupy space effectively."""
 
-        self.control.set_parameters(
-            v_max=10,
-            r_max=30,
-            k_mig=3,
-            k_rep=25,
-            k_sep=2,
-            k_coh=0,
-        )
+        self.control.set_parameters(**self.control.config.gains("cover"))
         self.control.space_ccupation()
 
 
@@ -1,51 +1,103 @@
-import airsim
+import math
 import time
 import numpy as np
 import os
-
-# Build a connection with AirSim
-client = airsim.MultirotorClient()
+from dispatch import DirectSender, EventTriggeredSender
+from groups import GroupRegistry
+from launch import LaunchOrchestrator
+from obstacles import ObstacleField
+from orca import OrcaAvoidance
+from paths import reference_path
+from pursuit import PursuitEngine
+from registry import VehicleRegistry
+from scheduler import TickScheduler
+from simulator import make_client
+from state import SwarmState
+
+# Build a connection with AirSim, or the headless simulator with HGIC_BACKEND=sim
+client = make_client()
 client.confirmConnection()
 
-# Initialize the UAVs position
-origin_x = [0, 2, 4, 0, 2, 4, 0, 2, 4]
-origin_y = [0, 0, 0, -3, -2, -3, 3, 2, 3]
-origin_z = []
+# Vehicles of the swarm and their spawn origins, from settings.json (or HGIC_SETTINGS)
+registry = VehicleRegistry.from_settings()
+names = registry.names
+num_uavs = len(registry)
+
+# Three sub-swarms of consecutive UAVs, used by the split and obstacle missions
+groups = GroupRegistry.by_index(num_uavs, 3)
+
+# The basic movements run at 10 Hz and only resend commands that changed
+scheduler = TickScheduler(10)
+
+# Reciprocal velocity obstacles in place of the UAV-to-UAV repulsion of the
+# formation missions, with HGIC_AVOIDANCE=orca
+avoidance = None
+if os.environ.get("HGIC_AVOIDANCE") == "orca":
+    avoidance = OrcaAvoidance(period=scheduler.period)
 
 
 def get_UAV_pos(client, vehicle_name="SimpleFlight"):
-    global origin_x
-    global origin_y
-    # global origin_z
     state = client.simGetGroundTruthKinematics(vehicle_name=vehicle_name)
     x = state.position.x_val
     y = state.position.y_val
-    i = int(vehicle_name[3])
-    x += origin_x[i - 1]
-    y += origin_y[i - 1]
+    origin_x, origin_y = registry.origin(vehicle_name)
+    x += origin_x
+    y += origin_y
     pos = np.array([[x], [y]])
     return pos
 
 
-client = airsim.MultirotorClient()
-
-
-def take_off():
-    for i in range(9):  # adjust the number based on the number of UAVs
-        name = "UAV" + str(i + 1)
-        client.enableApiControl(True, name)
-        client.armDisarm(True, name)
-        if i != 8:
-            client.takeoffAsync(vehicle_name=name)
-        else:
-            client.takeoffAsync(vehicle_name=name).join()
-
-    for i in range(9):  # adjust the number based on the number of UAVs
-        name = "UAV" + str(i + 1)
-        if i != 8:
-            client.moveToZAsync(-3, 1, vehicle_name=name)
-        else:
-            client.moveToZAsync(-3, 1, vehicle_name=name).join()
+def get_swarm_pos():
+    # (2, N) positions of the whole swarm, read once per tick
+    return np.hstack([get_UAV_pos(client, vehicle_name=name) for name in names])
+
+
+def uav_repulsion(
+    positions, i, k_rep, safe_distance, repulsion_distance, unit=True, pos_i=None
+):
+    """Repulsion of UAV i from the others among the (2, N) positions.
+
+    Every UAV within safe_distance pushes k_rep * (safe_distance - distance)
+    along the unit offset, or the raw one without unit, and the sum so far
+    doubles for each of them within repulsion_distance, in index order.
+    Zero when the ORCA stage keeps the UAVs apart instead.
+    """
+    if avoidance is not None:
+        return np.zeros([2, 1])
+    if pos_i is None:
+        pos_i = positions[:, i : i + 1]
+    offsets = pos_i - positions
+    distance = np.linalg.norm(offsets, axis=0)
+    near = distance < safe_distance
+    near[i] = False
+    offsets, distance = offsets[:, near], distance[near]
+    if unit:
+        offsets = offsets / distance
+    push = k_rep * offsets * (safe_distance - distance)
+    doubled = np.cumsum((distance < repulsion_distance)[::-1])[::-1]
+    return (push * 2.0**doubled).sum(axis=1, keepdims=True)
+
+
+def avoid(v_cmd, positions):
+    """(2, N) commands made collision-free by the ORCA stage, when it is on.
+
+    Capped at the fastest command of the tick, so UAVs only slow down or
+    sidestep; each one is assumed to fly what it was sent on the last tick.
+    """
+    if avoidance is None:
+        return v_cmd
+    v_max = np.linalg.norm(v_cmd, axis=0).max()
+    return avoidance.velocities(positions.T, None, v_cmd.T, v_max).T
+
+
+def take_off(timeout=30):
+    # Launch every UAV at once and wait until the whole swarm is at 3 m
+    launcher = LaunchOrchestrator(make_client, altitude=-3, climb_speed=1)
+    not_ready = launcher.launch(names, timeout, scheduler.clock)
+    launcher.close()
+    if not_ready:
+        print(f"Not airborne after {timeout} s: {', '.join(not_ready)}")
+    return not_ready
 
 
 def merge():
@@ -59,18 +111,18 @@ def merge():
     d_desired = 3.5
 
     pos_mig = np.array([[5], [0]])
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
 
     for t in range(500):
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             pos_i = get_UAV_pos(client, vehicle_name=name_i)
             r_mig = pos_mig - pos_i
             v_mig = k_mig * r_mig / np.linalg.norm(r_mig)
@@ -79,10 +131,10 @@ def merge():
             v_rep = np.zeros([2, 1])
             N_i = 0
 
-            for j in range(9):
+            for j in range(num_uavs):
                 if j != i:
                     N_i += 1
-                    name_j = "UAV" + str(j + 1)
+                    name_j = names[j]
                     pos_j = get_UAV_pos(client, vehicle_name=name_j)
                     r_ij = pos_j - pos_i
                     dist = np.linalg.norm(r_ij)
@@ -97,23 +149,23 @@ def merge():
             v_coh = v_coh / N_i
             v_cmd[:, i : i + 1] = v_sep + v_coh + v_rep + v_mig
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
 
 
 def get_swarm_center():
-    for i in range(9):
+    for i in range(num_uavs):
         # get position of each UAV
-        name = "UAV" + str(i + 1)
+        name = names[i]
         pos = get_UAV_pos(client, vehicle_name=name)
         if i == 0:
             pos_sum = pos
         else:
             pos_sum += pos
-    pos_mig = pos_sum / 9
+    pos_mig = pos_sum / num_uavs
     return pos_mig
 
 
@@ -124,31 +176,31 @@ def spread():
     k_coh = 1
     k_mig = 1
     pos_mig = get_swarm_center()
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     # get average height of all UAVs
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
 
     # Main loop to control UAVs
     for t in range(300):
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             pos_i = get_UAV_pos(client, vehicle_name=name_i)
             r_mig = pos_mig - pos_i
             v_mig = k_mig * r_mig / np.linalg.norm(r_mig)
             v_sep = np.zeros([2, 1])
             v_coh = np.zeros([2, 1])
             N_i = 0
-            for j in range(9):
+            for j in range(num_uavs):
                 if j != i:
                     N_i += 1
-                    name_j = "UAV" + str(j + 1)
+                    name_j = names[j]
                     pos_j = get_UAV_pos(client, vehicle_name=name_j)
                     if np.linalg.norm(pos_j - pos_i) < r_max:
                         r_ij = pos_j - pos_i
@@ -158,8 +210,8 @@ def spread():
             v_coh = v_coh / N_i
             v_cmd[:, i : i + 1] = v_sep + v_coh + v_mig
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -170,71 +222,56 @@ def left():
     v_max = 5  # adjust maximum velocity to the left
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
+    sender = EventTriggeredSender(DirectSender(client), clock=scheduler.clock)
 
     # Main loop to control UAVs
-    for t in range(300):
-        v_cmd = np.zeros([2, 9])  # x, y, z velocity
-
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
-            # calculate x-axis velocity component based on current position
-            v_cmd[0, i] = 0
-            # keep y-axis velocity component at 0
-            v_cmd[1, i] = -v_max
-
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
-            )
+    for t in scheduler.ticks(300):
+        v_cmd = np.zeros([2, num_uavs])
+        # Move every UAV to the left at v_max
+        v_cmd[1, :] = -v_max
+        sender.send_velocities(names, v_cmd, z_cmd, scheduler.period)
 
 
 def right():
     v_max = 5
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
+    sender = EventTriggeredSender(DirectSender(client), clock=scheduler.clock)
 
-    for t in range(300):
-        v_cmd = np.zeros([2, 9])
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
-            v_cmd[0, i] = 0
-            v_cmd[1, i] = v_max
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
-            )
+    # Main loop to control UAVs
+    for t in scheduler.ticks(300):
+        v_cmd = np.zeros([2, num_uavs])
+        # Move every UAV to the right at v_max
+        v_cmd[1, :] = v_max
+        sender.send_velocities(names, v_cmd, z_cmd, scheduler.period)
 
 
 def up():
     v_max = 60  # adjust maximum velocity upwards
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd) - v_max
 
     # Main loop to control UAVs
     for t in range(300):
-        v_cmd = np.zeros([2, 9])
+        v_cmd = np.zeros([2, num_uavs])
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             pos_i = get_UAV_pos(client, vehicle_name=name_i)
 
             # calculate y-axis velocity component based on current position
@@ -244,8 +281,8 @@ def up():
             v_cmd[0, i] = 0
 
         # move all UAVs with the calculated velocity commands
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -255,22 +292,22 @@ def down():
     v_max = 5  # adjust maximum velocity upwards
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
 
     # Main loop to control UAVs
     for t in range(200):
-        v_cmd = np.zeros([2, 9])
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        v_cmd = np.zeros([2, num_uavs])
+        for i in range(num_uavs):
+            name_i = names[i]
             pos_i = get_UAV_pos(client, vehicle_name=name_i)
             v_cmd[1, i] = 0
             v_cmd[0, i] = 0
             z_cmd[i] = v_max
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd[i], 0.1, vehicle_name=name_i
             )
@@ -280,48 +317,38 @@ def forward():
     v_max = 5
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
+    sender = EventTriggeredSender(DirectSender(client), clock=scheduler.clock)
 
-    for t in range(300):
-        v_cmd = np.zeros([2, 9])
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
-            v_cmd[0, i] = v_max
-            v_cmd[1, i] = 0
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
-            )
+    # Main loop to control UAVs
+    for t in scheduler.ticks(300):
+        v_cmd = np.zeros([2, num_uavs])
+        # Move every UAV forward at v_max
+        v_cmd[0, :] = v_max
+        sender.send_velocities(names, v_cmd, z_cmd, scheduler.period)
 
 
 def backward():
     v_max = 5
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
+    sender = EventTriggeredSender(DirectSender(client), clock=scheduler.clock)
 
-    for t in range(300):
-        v_cmd = np.zeros([2, 9])
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
-            v_cmd[0, i] = -v_max
-            v_cmd[1, i] = 0
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
-            )
+    # Main loop to control UAVs
+    for t in scheduler.ticks(300):
+        v_cmd = np.zeros([2, num_uavs])
+        # Move every UAV backward at v_max
+        v_cmd[0, :] = -v_max
+        sender.send_velocities(names, v_cmd, z_cmd, scheduler.period)
 
 
 def fly_circle():
@@ -333,24 +360,34 @@ def fly_circle():
     k_mig = 1
     k_rep = 10
     pos_mig = np.array([[25], [0]])
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     # get average height of all UAVs
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
 
+    # Rotating triangle of radius 20 around (0, 15), flown from tick 50 to 450
+    path = reference_path(
+        "ring",
+        num_uavs,
+        500,
+        period=500,
+        center=(0, 15),
+        radius=20,
+        spacing=2 * np.pi / 3,
+    )
+
     # Main loop to control UAVs
     for t in range(500):
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             pos_i = get_UAV_pos(client, vehicle_name=name_i)
             r_mig = pos_mig - pos_i
-            angle = 2 * np.pi * t / 500  # Angle based on the current time step
             circle_radius = 20  # Radius of the circular pattern
             circle_center = np.array([[0], [0]])  # Center point of the circular pattern
 
@@ -365,9 +402,9 @@ def fly_circle():
                 v_sep_temp = np.zeros([2, 1])  # Temporary separation velocity
                 v_avoid = np.zeros([2, 1])  # Collision avoidance velocity
 
-                for j in range(9):
+                for j in range(num_uavs):
                     if j != i:
-                        name_j = "UAV" + str(j + 1)
+                        name_j = names[j]
                         pos_j = get_UAV_pos(client, vehicle_name=name_j)
                         r_ij = pos_j - pos_i
                         separation_distance = np.linalg.norm(r_ij)
@@ -392,17 +429,7 @@ def fly_circle():
             elif t < 450:
                 # Fixed triangular formation and circular pattern with collision avoidance
                 formation_radius = 20  # Radius of the triangular formation
-                formation_center = np.array(
-                    [[0], [15]]
-                )  # Center point of the triangular formation
-                angle_offset = (
-                    2 * np.pi / 3
-                )  # Angular offset between UAVs in the triangular formation
-
-                desired_angle = angle_offset * i + angle
-                desired_position = formation_center + formation_radius * np.array(
-                    [[np.cos(desired_angle)], [np.sin(desired_angle)]]
-                )
+                desired_position = path[t, i, :2].reshape(2, 1)
                 v_mig = k_mig * (desired_position - pos_i)
 
                 # Add circular motion
@@ -410,9 +437,9 @@ def fly_circle():
 
                 v_avoid = np.zeros([2, 1])  # Collision avoidance velocity
 
-                for j in range(9):
+                for j in range(num_uavs):
                     if j != i:
-                        name_j = "UAV" + str(j + 1)
+                        name_j = names[j]
                         pos_j = get_UAV_pos(client, vehicle_name=name_j)
                         r_ij = pos_j - pos_i
                         separation_distance = np.linalg.norm(r_ij)
@@ -437,10 +464,10 @@ def fly_circle():
             v_sep = np.zeros([2, 1])
             v_coh = np.zeros([2, 1])
             N_i = 0
-            for j in range(9):
+            for j in range(num_uavs):
                 if j != i:
                     N_i += 1
-                    name_j = "UAV" + str(j + 1)
+                    name_j = names[j]
                     pos_j = get_UAV_pos(client, vehicle_name=name_j)
                     if np.linalg.norm(pos_j - pos_i) < r_max:
                         r_ij = pos_j - pos_i
@@ -450,8 +477,8 @@ def fly_circle():
             v_coh = v_coh / N_i
             v_cmd[:, i : i + 1] = v_sep + v_coh + v_mig
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -460,14 +487,14 @@ def fly_circle():
 def test():
     k_mig = 1
     pos_mig = np.array([[25], [0]])
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     # get average height of all UAVs
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
 
@@ -476,12 +503,12 @@ def test():
         angle = 2 * np.pi * t / 600  # Angle based on the current time step
         circle_radius = 20  # Radius of the circular pattern
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             pos_i = get_UAV_pos(client, vehicle_name=name_i)
 
             # Define the subgroups
-            subgroup = (i + 1) // 3
+            subgroup = groups.labels[i]
 
             # Define the subgroup's center point
             subgroup_center_angle = 2 * np.pi * subgroup / 3
@@ -497,9 +524,9 @@ def test():
                 5  # Distance between the UAVs in the triangular formation
             )
             formation_angle_offset = (
-                2 * np.pi / 3
+                2 * np.pi / groups.sizes[subgroup]
             )  # Angular offset between UAVs in the triangular formation
-            formation_angle = formation_angle_offset * (i % 3)
+            formation_angle = formation_angle_offset * groups.rank[i]
             formation_point = subgroup_center + formation_radius * np.array(
                 [[np.cos(formation_angle)], [np.sin(formation_angle)]]
             )
@@ -509,8 +536,8 @@ def test():
             v_cmd[:, i : i + 1] = v_mig
 
         # Set the velocity for each UAV
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -520,7 +547,7 @@ def test2():
     k_mig = 1
     k_rep = 10  # Repulsion coefficient
     pos_mig = np.array([[25], [0]])
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     safe_distance = 5  # Safe distance between UAVs
     repulsion_distance = 3  # Distance at which UAVs start repelling each other
@@ -528,23 +555,23 @@ def test2():
     # get average height of all UAVs
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
 
     # Main loop to control UAVs
     for t in range(600):
+        team_positions = get_swarm_pos()
         angle = 2 * np.pi * t / 600  # Angle based on the current time step
         circle_radius = 15  # Radius of the circular pattern
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
+        for i in range(num_uavs):
+            pos_i = team_positions[:, i : i + 1]
 
             # Define the subgroups
-            subgroup = i // 3
+            subgroup = groups.labels[i]
 
             # Define the subgroup's center point
             subgroup_center_angle = 2 * np.pi * subgroup / 3
@@ -560,9 +587,9 @@ def test2():
                 5  # Distance between the UAVs in the triangular formation
             )
             formation_angle_offset = (
-                2 * np.pi / 3
+                2 * np.pi / groups.sizes[subgroup]
             )  # Angular offset between UAVs in the triangular formation
-            formation_angle = formation_angle_offset * (i % 3)
+            formation_angle = formation_angle_offset * groups.rank[i]
             formation_point = subgroup_center + formation_radius * np.array(
                 [[np.cos(formation_angle)], [np.sin(formation_angle)]]
             )
@@ -571,30 +598,18 @@ def test2():
             v_mig = k_mig * (formation_point - pos_i)
 
             # Collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        # Calculate a repulsion vector
-                        repulsion_vector = pos_i - pos_j
-                        # Normalize and scale by the repulsion coefficient
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        # If the distance is below the repulsion distance, scale the repulsion vector further
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
+        # Keep the UAVs apart
+        v_cmd = avoid(v_cmd, team_positions)
+
         # Set the velocity for each UAV
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -604,7 +619,7 @@ def circle_move():
     k_mig = 1
     k_rep = 10  # Repulsion coefficient
     pos_mig = np.array([[25], [0]])
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     safe_distance = 2.5  # Safe distance between UAVs
     repulsion_distance = 1.5  # Distance at which UAVs start repelling each other
@@ -613,15 +628,16 @@ def circle_move():
     # for easy to control, we set the height of all UAVs to be the same
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
     v_rep = np.zeros([2, 1])
 
     # Main loop to control UAVs
     for t in range(600):
+        team_positions = get_swarm_pos()
         angle = (
             2 * np.pi * t / 600
         )  # Angle based on the current time step（we hope have a circle movement）
@@ -632,16 +648,14 @@ def circle_move():
             [[np.cos(angle)], [np.sin(angle)]]
         )
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(
-                client, vehicle_name=name_i
-            )  # store the position of the current UAV
+        for i in range(num_uavs):
+            # store the position of the current UAV
+            pos_i = team_positions[:, i : i + 1]
 
             # Define the formation points for each UAV within the group
             formation_radius = 5  # Distance between the UAVs in the formation
             formation_angle_offset = (
-                2 * np.pi / 9
+                2 * np.pi / num_uavs
             )  # Angular offset between UAVs in the formation
             formation_angle = (
                 formation_angle_offset * i
@@ -654,30 +668,18 @@ def circle_move():
             v_mig = k_mig * (formation_point - pos_i)
 
             # Collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        # Calculate a repulsion vector
-                        repulsion_vector = pos_i - pos_j
-                        # Normalize and scale by the repulsion coefficient
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        # If the distance is below the repulsion distance, scale the repulsion vector further
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
+        # Keep the UAVs apart
+        v_cmd = avoid(v_cmd, team_positions)
+
         # Set the velocity for each UAV
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -706,44 +708,31 @@ def test_obs():
     z_cmd = np.mean(
         [
             client.getMultirotorState(
-                vehicle_name="UAV" + str(i + 1)
+                vehicle_name=names[i]
             ).kinematics_estimated.position.z_val
-            for i in range(9)
+            for i in range(num_uavs)
         ]
     )
 
+    commands = np.zeros([2, num_uavs])
     for t in range(600):
         angle = 2 * np.pi * t / 900
         group_center = group_center_radius * np.array(
             [[np.cos(angle)], [np.sin(angle)]]
         )
-        team_positions = [
-            get_UAV_pos(client, vehicle_name="UAV" + str(i + 1)) for i in range(9)
-        ]
+        team_positions = get_swarm_pos()
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = team_positions[i]
-            formation_angle = 2 * np.pi * i / 9
+        for i in range(num_uavs):
+            pos_i = team_positions[:, i : i + 1]
+            formation_angle = 2 * np.pi * i / num_uavs
             formation_point = group_center + formation_radius * np.array(
                 [[np.cos(formation_angle)], [np.sin(formation_angle)]]
             )
             v_mig = k_mig * (formation_point - pos_i)
 
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    pos_j = team_positions[j]
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             v_avoid = np.zeros([2, 1])
             for obstacle in obstacles:
@@ -786,8 +775,13 @@ def test_obs():
             # if np.linalg.norm(v_cmd) > max_speed:
             #     v_cmd = max_speed * (v_cmd / np.linalg.norm(v_cmd))
 
+            commands[:, i : i + 1] = v_cmd
+
+        # Keep the UAVs apart, then set the velocity for each UAV
+        commands = avoid(commands, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_cmd[0, 0], v_cmd[1, 0], z_cmd, 0.1, vehicle_name=name_i
+                commands[0, i], commands[1, i], z_cmd, 0.1, vehicle_name=names[i]
             )
 
 
@@ -795,7 +789,7 @@ def circle_move_with_obstacles():  ### this one is working
     k_mig = 0.5
     k_rep = 10  # Repulsion coefficient
     pos_mig = np.array([[25], [0]])
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     safe_distance = 2.5  # Safe distance between UAVs
     repulsion_distance = 1.5  # Distance at which UAVs start repelling each other
@@ -808,14 +802,16 @@ def circle_move_with_obstacles():  ### this one is working
         ((-15, -40), (-20, -40)),  # Obstacle 4
         ((10, 30), (-70, -50)),
     ]  # Obstacle 5
+    # Signed distance to the obstacles is precomputed once for the whole run
+    field = ObstacleField(boxes=obstacles)
 
     # get average height of all UAVs
     # for easy to control, we set the height of all UAVs to be the same
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
     v_rep = np.zeros([2, 1])
@@ -832,16 +828,19 @@ def circle_move_with_obstacles():  ### this one is working
             [[np.cos(angle)], [np.sin(angle)]]
         )
 
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(
-                client, vehicle_name=name_i
-            )  # store the position of the current UAV
+        # Read every UAV once and sample the obstacle repulsion for all of them
+        team_positions = np.hstack(
+            [get_UAV_pos(client, vehicle_name=names[i]) for i in range(num_uavs)]
+        )
+        v_obstacles = field.repulsion(team_positions.T, k_rep, feel_distance).T
+
+        for i in range(num_uavs):
+            pos_i = team_positions[:, i : i + 1]
 
             # Define the formation points for each UAV within the group
             formation_radius = 5  # Distance between the UAVs in the formation
             formation_angle_offset = (
-                2 * np.pi / 9
+                2 * np.pi / num_uavs
             )  # Angular offset between UAVs in the formation
             formation_angle = (
                 formation_angle_offset * i
@@ -854,60 +853,27 @@ def circle_move_with_obstacles():  ### this one is working
             v_mig = k_mig * (formation_point - pos_i)
 
             # Collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        # Calculate a repulsion vector
-                        repulsion_vector = pos_i - pos_j
-                        # Normalize and scale by the repulsion coefficient
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        # If the distance is below the repulsion distance, scale the repulsion vector further
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             # Obstacle avoidance
-            v_obstacle = np.zeros([2, 1])
-            for obstacle in obstacles:
-                obstacle_pos = np.array(obstacle[0])
-                obstacle_radius = obstacle[1]
-                obstacle_vector = pos_i - obstacle_pos
-                obstacle_distance = np.linalg.norm(obstacle_vector)
-                if obstacle_distance < feel_distance:
-                    obstacle_direction = obstacle_vector / obstacle_distance
-                    # Add repulsion behavior if UAV is close to the obstacle
-                    if obstacle_distance < repulsion_distance:
-                        v_repulsion = (
-                            k_rep
-                            * (obstacle_direction / obstacle_distance)
-                            * (repulsion_distance - obstacle_distance)
-                        )
-                        v_obstacle += v_repulsion
-                    else:
-                        v_obstacle += (
-                            k_rep
-                            * (obstacle_direction / obstacle_distance)
-                            * (feel_distance - obstacle_distance)
-                        )
+            v_obstacle = v_obstacles[:, i : i + 1]
 
             v_cmd[:, i : i + 1] = v_mig + v_rep + v_obstacle
 
+        # Keep the UAVs apart
+        v_cmd = avoid(v_cmd, team_positions)
+
         # Set the velocity for each UAV
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
 
-    for i in range(9):
-        name_i = "UAV" + str(i + 1)
+    for i in range(num_uavs):
+        name_i = names[i]
         client.moveByVelocityZAsync(0, 0, z_cmd, 0.1, vehicle_name=name_i)
 
 
@@ -927,53 +893,47 @@ def cover_block():
     repulsion_distance_uav = 2.5  # Distance at which UAVs repel each other
     k_rep = 10  # Repulsion coefficient
 
+    field = ObstacleField(circles=obstacles)
+    # One ring of UAVs around each obstacle, at its safe distance
+    path = reference_path(
+        "cover", num_uavs, 600, centers=obstacles, radius=safe_distance, z=-40
+    )
+
     # Main loop to control UAVs
+    commands = np.zeros([2, num_uavs])
     for t in range(600):
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        # Read every UAV once and sample the obstacle repulsion for all of them
+        team_positions = np.hstack(
+            [get_UAV_pos(client, vehicle_name=names[i]) for i in range(num_uavs)]
+        ).T
+        v_obstacles = field.repulsion(
+            team_positions, k_rep, feel_distance_obstacle, per_distance=False
+        )
+
+        for i in range(num_uavs):
             pos_i = np.append(
-                get_UAV_pos(client, vehicle_name=name_i)[:2], -40
+                team_positions[i], -40
             )  # Set x, y, and z-coordinate to -40
 
             # Determine the obstacle index for the current UAV
-            obstacle_index = i // 3
+            obstacle_index = groups.labels[i]
 
-            # Get the obstacle center point and safe distance for the corresponding index
+            # Get the obstacle center point and the UAV's place on its ring
             obstacle_center = np.array(obstacles[obstacle_index])
-            obstacle_safe_distance = safe_distance[obstacle_index]
-
-            # Calculate the angle for the circular formation
-            angle = 2 * np.pi * i / 3
-
-            # Calculate the position for the UAV in the circular formation
-            formation_pos = obstacle_center + obstacle_safe_distance * np.array(
-                [np.cos(angle), np.sin(angle)]
-            )
+            formation_pos = path[t, i]
 
             # Calculate the desired velocity for each UAV to reach its formation point
             v_mig = k_mig * (formation_pos[:2] - pos_i[:2])
 
             # Collision avoidance with other UAVs
-            v_rep_uav = np.zeros(2)
-            for j in range(9):
-                if j != i:
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = np.append(
-                        get_UAV_pos(client, vehicle_name=name_j)[:2], -40
-                    )  # Set x, y, and z-coordinate to -40
-                    distance_uav = np.linalg.norm(pos_j - pos_i)
-                    if distance_uav < safe_distance_uav:
-                        # Calculate the repulsion vector for UAVs
-                        repulsion_vector_uav = pos_i[:2] - pos_j[:2]
-                        # Scale by the repulsion coefficient and the distance to create repulsion effect
-                        v_rep_uav += (
-                            k_rep
-                            * (safe_distance_uav - distance_uav)
-                            * repulsion_vector_uav
-                        )
-                        # If the distance is below the repulsion distance, scale the repulsion vector further
-                        if distance_uav < repulsion_distance_uav:
-                            v_rep_uav *= 2
+            v_rep_uav = uav_repulsion(
+                team_positions.T,
+                i,
+                k_rep,
+                safe_distance_uav,
+                repulsion_distance_uav,
+                unit=False,
+            )[:, 0]
 
             # Collision avoidance with obstacles
             v_rep_obstacle = np.zeros(2)
@@ -987,25 +947,18 @@ def cover_block():
                 )
 
             # Obstacle avoidance
-            v_obstacle = np.zeros(2)
-            for obstacle in obstacles:
-                obstacle_center = np.array(obstacle)
-                obstacle_vector = pos_i[:2] - obstacle_center
-                obstacle_distance = np.linalg.norm(obstacle_vector)
-                if obstacle_distance < feel_distance_obstacle:
-                    obstacle_direction = obstacle_center - pos_i[:2]
-                    v_obstacle += (
-                        k_rep
-                        * (obstacle_direction / obstacle_distance)
-                        * (feel_distance_obstacle - obstacle_distance)
-                    )
+            v_obstacle = v_obstacles[i]
 
             # Adjust the desired velocity based on obstacle avoidance
             v_mig += v_rep_uav + v_rep_obstacle + v_obstacle
 
-            # Set the velocity for each UAV
+            commands[:, i] = v_mig
+
+        # Keep the UAVs apart, then set the velocity for each UAV
+        commands = avoid(commands, team_positions.T)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_mig[0], v_mig[1], -40, 0.1, vehicle_name=name_i
+                commands[0, i], commands[1, i], -40, 0.1, vehicle_name=names[i]
             )
 
 
@@ -1026,37 +979,46 @@ def spiral_motion():
     spiral_min_radius = 25  # Minimum radius of the spiral
     spiral_radius_increment = 1  # Change in radius after each complete spiral
 
+    field = ObstacleField(circles=obstacles)
+    # Every group spirals once around its obstacle, climbing as it goes
+    path = reference_path(
+        "spiral",
+        num_uavs,
+        600,
+        centers=obstacles,
+        radius=spiral_min_radius,
+        radius_mid=spiral_max_radius,
+        z=spiral_center_height,
+        climb=spiral_increment,
+    )
+
     # Main loop to control UAVs
+    commands = np.zeros([2, num_uavs])
     for t in range(600):
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        # Read every UAV once and sample the obstacle repulsion for all of them
+        team_positions = np.hstack(
+            [get_UAV_pos(client, vehicle_name=names[i]) for i in range(num_uavs)]
+        ).T
+        v_obstacles = field.repulsion(
+            team_positions, k_rep, feel_distance_obstacle, per_distance=False
+        )
+
+        for i in range(num_uavs):
             pos_i = np.append(
-                get_UAV_pos(client, vehicle_name=name_i)[:2], -40
+                team_positions[i], -40
             )  # Set x, y, and z-coordinate to -40
 
             # Determine the obstacle index for the current UAV
-            obstacle_index = i // 3
+            obstacle_index = groups.labels[i]
 
             # Get the obstacle center point and safe distance for the corresponding index
             obstacle_center = np.array(
                 [obstacles[obstacle_index][0], obstacles[obstacle_index][1], 0]
             )
 
-            obstacle_safe_distance = safe_distance[obstacle_index]
-
-            # Calculate the current height and radius based on the current time step
-            current_height = spiral_center_height - t * spiral_increment / 600
-            current_radius = spiral_min_radius + (
-                (spiral_max_radius - spiral_min_radius) * np.sin(np.pi * t / 600)
-            )
-
-            # Calculate the angle for the spiraling formation
-            angle = 2 * np.pi * i / 3 + 2 * np.pi * t / 600
-
-            # Calculate the position for the UAV in the spiraling formation
-            formation_pos = obstacle_center + current_radius * np.array(
-                [np.cos(angle), np.sin(angle), current_height]
-            )
+            # Position and height for the UAV in the spiraling formation
+            formation_pos = path[t, i]
+            current_height = formation_pos[2]
 
             # Calculate the desired velocity for each UAV to reach its formation point
             v_mig = k_mig * (formation_pos[:2] - pos_i[:2])
@@ -1064,26 +1026,14 @@ def spiral_motion():
             # ... Rest of your original code for collision avoidance ...
             # Collision avoidance with obstacles
             # Collision avoidance with other UAVs
-            v_rep_uav = np.zeros(2)
-            for j in range(9):
-                if j != i:
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = np.append(
-                        get_UAV_pos(client, vehicle_name=name_j)[:2], -40
-                    )  # Set x, y, and z-coordinate to -40
-                    distance_uav = np.linalg.norm(pos_j - pos_i)
-                    if distance_uav < safe_distance_uav:
-                        # Calculate the repulsion vector for UAVs
-                        repulsion_vector_uav = pos_i[:2] - pos_j[:2]
-                        # Scale by the repulsion coefficient and the distance to create repulsion effect
-                        v_rep_uav += (
-                            k_rep
-                            * (safe_distance_uav - distance_uav)
-                            * repulsion_vector_uav
-                        )
-                        # If the distance is below the repulsion distance, scale the repulsion vector further
-                        if distance_uav < repulsion_distance_uav:
-                            v_rep_uav *= 2
+            v_rep_uav = uav_repulsion(
+                team_positions.T,
+                i,
+                k_rep,
+                safe_distance_uav,
+                repulsion_distance_uav,
+                unit=False,
+            )[:, 0]
 
             v_rep_obstacle = np.zeros(2)
             # distance_to_center = np.linalg.norm(pos_i[:2] - obstacle_center)
@@ -1098,25 +1048,22 @@ def spiral_motion():
                 )
 
             # Obstacle avoidance
-            v_obstacle = np.zeros(2)
-            for obstacle in obstacles:
-                obstacle_center = np.array(obstacle)
-                obstacle_vector = pos_i[:2] - obstacle_center
-                obstacle_distance = np.linalg.norm(obstacle_vector)
-                if obstacle_distance < feel_distance_obstacle:
-                    obstacle_direction = obstacle_center - pos_i[:2]
-                    v_obstacle += (
-                        k_rep
-                        * (obstacle_direction / obstacle_distance)
-                        * (feel_distance_obstacle - obstacle_distance)
-                    )
+            v_obstacle = v_obstacles[i]
 
             # Adjust the desired velocity based on obstacle avoidance
             v_mig += v_rep_uav + v_rep_obstacle + v_obstacle
 
-            # Set the velocity and altitude for each UAV
+            commands[:, i] = v_mig
+
+        # Keep the UAVs apart, then set the velocity and altitude for each UAV
+        commands = avoid(commands, team_positions.T)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_mig[0], v_mig[1], current_height, 0.1, vehicle_name=name_i
+                commands[0, i],
+                commands[1, i],
+                path[t, i, 2],
+                0.1,
+                vehicle_name=names[i],
             )
 
 
@@ -1125,7 +1072,7 @@ def target():
     radius = 50  # radius of circle
     height = -40  # altitude
     speed = 30  # speed of UAV
-    name_i = "UAV1"  # the UAV we're controlling
+    name_i = names[0]  # the UAV we're controlling
     time_step = 0.1  # Time interval in seconds
 
     # Get current position
@@ -1167,156 +1114,93 @@ def target():
         angle += angle_increment
 
 
-def chasing():
+def chase_state(chasers, targets):
+    """Snapshot of the chasers and targets, with their indices into it."""
+    involved = [registry.index[name] for name in list(chasers) + list(targets)]
+    state = SwarmState([names[i] for i in involved], registry.origins[involved])
+    return state, np.arange(len(chasers)), len(chasers) + np.arange(len(targets))
+
+
+def chasing(chasers=None, targets=None):
     # Parameters
-    radius = 60  # radius of circle
     height = -40  # altitude
     speed = 30  # speed of UAV
-    time_step = 0.1  # Time interval in seconds
 
-    # Assign UAVs to chase UAV 1
-    chase_uavs = ["UAV2", "UAV3", "UAV4"]
-    target_uav = "UAV1"
+    # By default UAV2-UAV4 chase UAV1, each chaser goes after its nearest target
+    chasers = names[1:4] if chasers is None else chasers
+    targets = names[:1] if targets is None else targets
+    state, chase_index, target_index = chase_state(chasers, targets)
+    pursuit = PursuitEngine(speed, k_rep=0)
 
     # Main loop to control chasing UAVs
-    for t in range(400):
-        # Get current position of target UAV
-        target_pos = get_UAV_pos(client, vehicle_name=target_uav)
-
-        # Loop through the chasing UAVs
-        for name_i in chase_uavs:
-            # Get current position of chasing UAV
-            current_pos = get_UAV_pos(client, vehicle_name="UAV1")
-
-            # Calculate the direction vector towards the target UAV
-            direction = target_pos - current_pos
-            distance = np.linalg.norm(direction)
-
-            # Normalize the direction vector
-            if distance != 0:
-                direction /= distance
-
-            # Calculate the velocity vector
-            velocity = speed * direction
+    for t in scheduler.ticks(400):
+        state.update(client)
+        velocities = pursuit.velocities(
+            state.positions, state.velocities, chase_index, target_index
+        )
 
-            # Send the command to the chasing UAV
+        # Send the command to the chasing UAVs
+        for name_i, (v_x, v_y) in zip(chasers, velocities):
             client.moveByVelocityZAsync(
-                float(velocity[0]),
-                float(velocity[1]),
-                height,
-                time_step,
-                vehicle_name=name_i,
+                float(v_x), float(v_y), height, scheduler.period, vehicle_name=name_i
             )
 
-        # Wait for the next time step
-        time.sleep(time_step)
-
 
 def target_and_chasing():
     # Parameters
     radius = 30  # radius of circle
     height = -30  # altitude
     speed = 20  # speed of UAV
-    time_step = 0.1  # Time interval in seconds
+    time_step = scheduler.period  # Time interval in seconds
     speed_chasing = 25
 
     # Assign UAVs to chase UAV 1
-    chase_uavs = ["UAV2", "UAV3", "UAV4"]
-    target_uav = "UAV1"
-    toat_uavs = ["UAV1", "UAV2", "UAV3", "UAV4"]
-
-    # Get initial position of UAV1
-    current_pos = get_UAV_pos(client, vehicle_name="UAV1")
+    chase_uavs = names[1:4]
+    target_uav = names[0]
+    toat_uavs = names[:4]
+    state, chase_index, target_index = chase_state(chase_uavs, [target_uav])
+    # Chasers also keep clear of each other and of the target
+    pursuit = PursuitEngine(speed_chasing, k_rep=6, safe_distance=5)
 
     # Calculate the time it takes for one complete circle
-    circle_time = 2 * math.pi * radius / speed
+    circle_time = 2 * np.pi * radius / speed
 
     # Calculate the angle increment for each time step
-    angle_increment = 2 * math.pi / (circle_time / time_step)
-
-    # Set initial angle
-    angle = 0
+    angle_increment = 2 * np.pi / (circle_time / time_step)
 
     # Main loop to control UAVs
-    for t in range(300):
-        # Calculate the position of UAV1 on the circle
-        x = current_pos[0] + radius * np.cos(angle)
-        y = current_pos[1] + radius * np.sin(angle)
-
-        # Calculate the distance and direction to the target position
-        dx = x - current_pos[0]
-        dy = y - current_pos[1]
-        distance = np.sqrt(dx**2 + dy**2)
-
-        # Calculate the velocity components based on the distance and speed
-        v_x = -speed * (dx / distance)
-        v_y = -speed * (dy / distance)
-
-        # Send the command to UAV1
+    for t in scheduler.ticks(300):
+        # UAV1 flies a circle of the given radius
+        angle = t * angle_increment
+        v_x = -speed * np.cos(angle)
+        v_y = -speed * np.sin(angle)
         client.moveByVelocityZAsync(
             float(v_x), float(v_y), height, time_step, vehicle_name=target_uav
         )
 
-        # Get current position of UAV1
-        time.sleep(time_step)
-        current_pos = get_UAV_pos(client, vehicle_name=target_uav)
-        # Get current position of target UAV (UAV1)
-        # time.sleep(time_step)
-        target_pos = current_pos
-
-        # Loop through the chasing UAVs
-        for name_i in chase_uavs:
-            # Get current position of chasing UAV
-            current_pos_chase = get_UAV_pos(client, vehicle_name=name_i)
-
-            # Calculate the direction vector towards the target UAV (UAV1)
-            direction = target_pos - current_pos_chase
-            distance = np.linalg.norm(direction)  # distance formula
-
-            # Normalize the direction vector
-            if distance != 0:
-                direction /= distance
-
-            # Calculate the velocity vector
-            repulsion_vectors = uav_collision()
-
-            # Combine the chasing velocity and collision avoidance velocity
-
-            velocity = (
-                speed_chasing * direction + repulsion_vectors[toat_uavs.index(name_i)]
-            )
-            # velocity = speed_chasing * direction
+        # The chasers aim where UAV1 will be, from one snapshot of all four UAVs
+        state.update(client)
+        velocities = pursuit.velocities(
+            state.positions, state.velocities, chase_index, target_index
+        )
 
-            # Send the command to the chasing UAVs
+        # Send the command to the chasing UAVs
+        for name_i, (v_x, v_y) in zip(chase_uavs, velocities):
             client.moveByVelocityZAsync(
-                float(velocity[0]),
-                float(velocity[1]),
-                height,
-                time_step,
-                vehicle_name=name_i,
+                float(v_x), float(v_y), height, time_step, vehicle_name=name_i
             )
 
-        # Update the angle
-        angle += angle_increment
     for i in toat_uavs:
         client.moveByVelocityZAsync(0, 0, height, time_step, vehicle_name=i)
 
 
 def stop_all():
     time_step = 0.1
-    total_uavs = [
-        "UAV1",
-        "UAV2",
-        "UAV3",
-        "UAV4",
-        "UAV5",
-        "UAV6",
-        "UAV7",
-        "UAV8",
-        "UAV9",
-    ]
+    total_uavs = names
     for i in total_uavs:
-        height = get_UAV_pos(client, vehicle_name=i)[2]
+        height = client.getMultirotorState(
+            vehicle_name=i
+        ).kinematics_estimated.position.z_val
         client.moveByVelocityZAsync(0, 0, height, time_step, vehicle_name=i)
 
 
@@ -1332,34 +1216,12 @@ def uav_collision():
     repulsion_distance = 10  # Distance at which UAVs repel the center point
     safe_distance_uav = 5  # Safe distance between UAVs
     K_rep = 6  # Repulsion coefficient
-    repulsion_vectors = []  # List to store the repulsion vectors for each UAV
-    for i in range(9):
-        name_i = "UAV" + str(i + 1)
-        pos_i = get_UAV_pos(
-            client, vehicle_name=name_i
-        )  # store the position of the current UAV
-
-        # Collision avoidance
-        v_rep = np.zeros([2, 1])
-        for j in range(9):
-            if j != i:
-                name_j = "UAV" + str(j + 1)
-                pos_j = get_UAV_pos(client, vehicle_name=name_j)
-                distance = np.linalg.norm(pos_j - pos_i)
-                if distance < safe_distance_uav:
-                    # Calculate a repulsion vector
-                    repulsion_vector = pos_i - pos_j
-                    # Normalize and scale by the repulsion coefficient
-                    v_rep += (
-                        K_rep
-                        * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                        * (safe_distance_uav - distance)
-                    )
-                    # If the distance is below the repulsion distance, scale the repulsion vector further
-                    if distance < repulsion_distance:
-                        v_rep *= 2
-        repulsion_vectors.append(v_rep)
-    return repulsion_vectors
+    # Repulsion vector of each UAV, reading the swarm once
+    team_positions = get_swarm_pos()
+    return [
+        uav_repulsion(team_positions, i, K_rep, safe_distance_uav, repulsion_distance)
+        for i in range(num_uavs)
+    ]
 
 
 def form_circle():
@@ -1369,7 +1231,7 @@ def form_circle():
     formation_radius = 5
     safe_distance = 2.5
     repulsion_distance = 1.5
-    formation_angle_offset = 2 * np.pi / 9
+    formation_angle_offset = 2 * np.pi / num_uavs
 
     # Define the group center and the repulsion vector
     group_center = np.array([[25], [0]])
@@ -1378,21 +1240,21 @@ def form_circle():
     # Compute the average height of all UAVs
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
 
     # Define the velocity command
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     # Main loop to control UAVs
     for t in range(500):  # assuming 200 time steps are enough to form the circle
-        for i in range(9):
-            # Define the name and position of the current UAV
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
+            # Define the position of the current UAV
+            pos_i = team_positions[:, i : i + 1]
 
             # Calculate the formation point for the current UAV
             formation_angle = formation_angle_offset * i
@@ -1404,31 +1266,19 @@ def form_circle():
             v_mig = k_mig * (formation_point - pos_i)
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Define the name and position of the other UAV
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             # Store the computed velocity command for the current UAV
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
+        # Keep the UAVs apart
+        v_cmd = avoid(v_cmd, team_positions)
+
         # Command each UAV to move according to the computed velocity command
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -1437,20 +1287,21 @@ def form_circle():
 def circle_move_2():
     k_mig = 1
     k_rep = 10  # Repulsion coefficient
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
     safe_distance = 2.5  # Safe distance between UAVs
     repulsion_distance = 1.5  # Distance at which UAVs start repelling each other
     group_center_radius = 20  # Set the radius of the circle for the group center
     z_cmd = [
         client.getMultirotorState(
-            vehicle_name="UAV" + str(i + 1)
+            vehicle_name=names[i]
         ).kinematics_estimated.position.z_val
-        for i in range(9)
+        for i in range(num_uavs)
     ]
     z_cmd = np.mean(z_cmd)
 
     # Main loop to control UAVs
     for t in range(600):
+        team_positions = get_swarm_pos()
         angle = (
             2 * np.pi * t / 600
         )  # Angle based on the current time step（we hope have a circle movement）
@@ -1458,39 +1309,24 @@ def circle_move_2():
         group_center = group_center_radius * np.array(
             [[np.cos(angle)], [np.sin(angle)]]
         )
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
+        for i in range(num_uavs):
+            pos_i = team_positions[:, i : i + 1]
             # Calculate the desired velocity for each UAV to reach its formation point
             v_mig = k_mig * (group_center - pos_i)
 
             # Collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_i)
-                    distance = np.linalg.norm(pos_j - pos_i)
-
-                    if distance < safe_distance:
-                        # Calculate a repulsion vector
-                        repulsion_vector = pos_i - pos_j
-                        # Normalize and scale by the repulsion coefficient, but only if the norm of the repulsion vector is not zero
-                        if np.linalg.norm(repulsion_vector) != 0:
-                            v_rep += (
-                                k_rep
-                                * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                                * (safe_distance - distance)
-                            )
-                            # If the distance is below the repulsion distance, scale the repulsion vector further
-                            if distance < repulsion_distance:
-                                v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
+        # Keep the UAVs apart
+        v_cmd = avoid(v_cmd, team_positions)
+
         # Set the velocity for each UAV
-        for i in range(9):
-            name_i = "UAV" + str(i + 1)
+        for i in range(num_uavs):
+            name_i = names[i]
             client.moveByVelocityZAsync(
                 v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
             )
@@ -1513,21 +1349,21 @@ def line():
     z_cmd = np.mean(
         [
             client.getMultirotorState(
-                vehicle_name="UAV" + str(i + 1)
+                vehicle_name=names[i]
             ).kinematics_estimated.position.z_val
-            for i in range(9)
+            for i in range(num_uavs)
         ]
     )
 
     # Define the velocity command
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     # Main loop to control UAVs
     for t in range(500):  # assuming 500 time steps are enough to form the grid
-        for i in range(9):
-            # Define the name and position of the current UAV
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
+            # Define the position of the current UAV
+            pos_i = team_positions[:, i : i + 1]
 
             # Calculate the formation point for the current UAV in the grid
             row = i // grid_size
@@ -1542,39 +1378,26 @@ def line():
             v_mig = k_mig * (formation_point - pos_i)
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Define the name and position of the other UAV
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             # Store the computed velocity command for the current UAV
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
-            # Move the UAV using the computed velocity command
+        # Keep the UAVs apart, then set the velocity for each UAV
+        v_cmd = avoid(v_cmd, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
+                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=names[i]
             )
 
     # Reverse the direction of the scan
     for t in range(500):  # assuming 500 time steps are enough to form the grid
-        for i in range(9):
-            # Define the name and position of the current UAV
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
+            # Define the position of the current UAV
+            pos_i = team_positions[:, i : i + 1]
 
             # Calculate the formation point for the current UAV in the grid
             row = i // grid_size
@@ -1589,31 +1412,18 @@ def line():
             v_mig = k_mig * (formation_point - pos_i)
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Define the name and position of the other UAV
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             # Store the computed velocity command for the current UAV
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
-            # Move the UAV using the computed velocity command
+        # Keep the UAVs apart, then set the velocity for each UAV
+        v_cmd = avoid(v_cmd, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
+                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=names[i]
             )
 
 
@@ -1631,18 +1441,19 @@ def form_grid_formation():
     z_cmd = np.mean(
         [
             client.getMultirotorState(
-                vehicle_name="UAV" + str(i + 1)
+                vehicle_name=names[i]
             ).kinematics_estimated.position.z_val
-            for i in range(9)
+            for i in range(num_uavs)
         ]
     )
 
     # Define the velocity command
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     # Main loop to control UAVs
     for t in range(500):  # Assuming 500 time steps are enough to form the grid
-        for i in range(9):
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
             # Calculate the row and column of the current UAV in the grid
             row = i // grid_rows
             col = i % grid_cols
@@ -1651,36 +1462,24 @@ def form_grid_formation():
             formation_point = np.array([[col], [row]]) * cell_distance
 
             # Calculate the position of the current UAV
-            pos_i = get_UAV_pos(client, vehicle_name="UAV" + str(i + 1))
+            pos_i = team_positions[:, i : i + 1]
 
             # Compute the desired velocity for the current UAV
             v_mig = k_mig * (formation_point - pos_i)
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Calculate the position of the other UAV
-                    pos_j = get_UAV_pos(client, vehicle_name="UAV" + str(j + 1))
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             # Store the computed velocity command for the current UAV
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
-            # Move the UAV using the computed velocity command
+        # Keep the UAVs apart, then set the velocity for each UAV
+        v_cmd = avoid(v_cmd, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name="UAV" + str(i + 1)
+                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=names[i]
             )
 
 
@@ -1688,7 +1487,7 @@ def form_slanted_line_formation():
     # Set the desired formation parameters
     k_mig = 1
     k_rep = 10
-    line_length = 9  # Number of UAVs in the line formation
+    line_length = num_uavs  # Number of UAVs in the line formation
     line_spacing = 8  # Spacing between UAVs in the line formation
     safe_distance = 5  # Safe distance between UAVs
     repulsion_distance = 5  # Distance at which UAVs start repelling each other
@@ -1697,51 +1496,38 @@ def form_slanted_line_formation():
     z_cmd = np.mean(
         [
             client.getMultirotorState(
-                vehicle_name="UAV" + str(i + 1)
+                vehicle_name=names[i]
             ).kinematics_estimated.position.z_val
-            for i in range(9)
+            for i in range(num_uavs)
         ]
     )
 
     # Define the velocity command
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
 
     # Main loop to control UAVs
     for t in range(500):  # Assuming 500 time steps are enough to form the line
-        for i in range(9):
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
             # Calculate the position of the current UAV in the slanted line formation
             pos_i = np.array([[i * line_spacing], [i]])
 
             # Compute the desired velocity for the current UAV
-            v_mig = k_mig * (
-                pos_i - get_UAV_pos(client, vehicle_name="UAV" + str(i + 1))
-            )
+            v_mig = k_mig * (pos_i - team_positions[:, i : i + 1])
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Calculate the position of the other UAV
-                    pos_j = get_UAV_pos(client, vehicle_name="UAV" + str(j + 1))
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance, pos_i=pos_i
+            )
 
             # Store the computed velocity command for the current UAV
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
-            # Move the UAV using the computed velocity command
+        # Keep the UAVs apart, then set the velocity for each UAV
+        v_cmd = avoid(v_cmd, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name="UAV" + str(i + 1)
+                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=names[i]
             )
 
 
@@ -1756,54 +1542,46 @@ def left_to_right_scan():
     z_cmd = np.mean(
         [
             client.getMultirotorState(
-                vehicle_name="UAV" + str(i + 1)
+                vehicle_name=names[i]
             ).kinematics_estimated.position.z_val
-            for i in range(9)
+            for i in range(num_uavs)
         ]
     )
 
     # Define the velocity command
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
+
+    # Every UAV moves scan_distance along x, keeping its own y
+    path = reference_path("scan", num_uavs, 500, distance=scan_distance)
 
     # Main loop to control UAVs
     for t in range(500):  # Assuming 500 time steps are enough to complete the scan
-        for i in range(9):
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
             # Calculate the position of the current UAV
-            pos_i = get_UAV_pos(client, vehicle_name="UAV" + str(i + 1))
+            pos_i = team_positions[:, i : i + 1]
 
             # Calculate the desired position for the current UAV along the scan line
-            desired_pos = np.array([[scan_distance * t / 500], [pos_i[1, 0]]])
+            desired_pos = np.array([[path[t, i, 0]], [pos_i[1, 0]]])
 
             # Compute the desired velocity for the current UAV
             v_mig = k_mig * (desired_pos - pos_i)
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Calculate the position of the other UAV
-                    pos_j = get_UAV_pos(client, vehicle_name="UAV" + str(j + 1))
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < scan_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (scan_distance - distance)
-                        )
+            v_rep = uav_repulsion(team_positions, i, k_rep, scan_distance, 0)
 
             # Store the computed velocity command for the current UAV
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
-            # Move the UAV using the computed velocity command
+        # Keep the UAVs apart, then move them along the scan line
+        v_cmd = avoid(v_cmd, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityAsync(
                 v_cmd[0, i],
                 v_cmd[1, i],
                 z_cmd,
                 scan_speed,
-                vehicle_name="UAV" + str(i + 1),
+                vehicle_name=names[i],
             )
 
 
@@ -1824,103 +1602,72 @@ def line_scan():
     z_cmd = np.mean(
         [
             client.getMultirotorState(
-                vehicle_name="UAV" + str(i + 1)
+                vehicle_name=names[i]
             ).kinematics_estimated.position.z_val
-            for i in range(9)
+            for i in range(num_uavs)
         ]
     )
 
     # Define the velocity command
-    v_cmd = np.zeros([2, 9])
+    v_cmd = np.zeros([2, num_uavs])
+
+    # Grid offsets for the scan, then mirrored along x for the way back
+    path = reference_path(
+        "grid_scan", num_uavs, 500, grid_size=grid_size, cell_distance=cell_distance
+    )
 
     # Main loop to control UAVs
     for t in range(500):  # assuming 500 time steps are enough to form the grid
-        for i in range(9):
-            # Define the name and position of the current UAV
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
+            # Define the position of the current UAV
+            pos_i = team_positions[:, i : i + 1]
 
             # Calculate the formation point for the current UAV in the grid
-            row = i // grid_size
-            col = i % grid_size
-            formation_point = (
-                group_center
-                + cell_distance * (col - grid_size // 2) * np.array([[1], [0]])
-                + cell_distance * (row - grid_size // 2) * np.array([[0], [1]])
-            )
+            formation_point = group_center + path[t, i, :2].reshape(2, 1)
 
             # Compute the desired velocity for the current UAV
             v_mig = k_mig * (formation_point - pos_i)
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Define the name and position of the other UAV
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
 
             # Store the computed velocity command for the current UAV
             v_cmd[:, i : i + 1] = v_mig + v_rep
 
-            # Move the UAV using the computed velocity command
+        # Keep the UAVs apart, then set the velocity for each UAV
+        v_cmd = avoid(v_cmd, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
+                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=names[i]
             )
 
     # Reverse the direction of the scan
     for t in range(500):  # assuming 500 time steps are enough to form the grid
-        for i in range(9):
-            # Define the name and position of the current UAV
-            name_i = "UAV" + str(i + 1)
-            pos_i = get_UAV_pos(client, vehicle_name=name_i)
+        team_positions = get_swarm_pos()
+        for i in range(num_uavs):
+            # Define the position of the current UAV
+            pos_i = team_positions[:, i : i + 1]
 
             # Calculate the formation point for the current UAV in the grid
-            row = i // grid_size
-            col = (grid_size - 1) - (i % grid_size)
-            formation_point = (
-                group_center
-                + cell_distance * (col - grid_size // 2) * np.array([[1], [0]])
-                + cell_distance * (row - grid_size // 2) * np.array([[0], [1]])
-            )
+            formation_point = group_center + path[500 + t, i, :2].reshape(2, 1)
 
             # Compute the desired velocity for the current UAV
             v_mig = k_mig * (formation_point - pos_i)
 
             # Perform collision avoidance
-            v_rep = np.zeros([2, 1])
-            for j in range(9):
-                if j != i:
-                    # Define the name and position of the other UAV
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = get_UAV_pos(client, vehicle_name=name_j)
-
-                    # Compute the repulsion vector if the other UAV is too close
-                    distance = np.linalg.norm(pos_j - pos_i)
-                    if distance < safe_distance:
-                        repulsion_vector = pos_i - pos_j
-                        v_rep += (
-                            k_rep
-                            * (repulsion_vector / np.linalg.norm(repulsion_vector))
-                            * (safe_distance - distance)
-                        )
-                        if distance < repulsion_distance:
-                            v_rep *= 2
+            v_rep = uav_repulsion(
+                team_positions, i, k_rep, safe_distance, repulsion_distance
+            )
             v_cmd[:, i : i + 1] = v_mig + v_rep
+
+        # Keep the UAVs apart, then set the velocity for each UAV
+        v_cmd = avoid(v_cmd, team_positions)
+        for i in range(num_uavs):
             client.moveByVelocityZAsync(
-                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
+                v_cmd[0, i], v_cmd[1, i], z_cmd, 0.1, vehicle_name=names[i]
             )
 
 
@@ -1,7 +1,23 @@
-import airsim
 import numpy as np
+from assignment import SlotAssigner
 from configuration import Configuration
-from scipy.spatial import Voronoi
+from coverage_control import CoverageController
+from dispatch import CommandDispatcher, EventTriggeredSender
+from flocking import (
+    clamp_speed,
+    migration_velocity,
+    select_backend,
+    tracking_velocity,
+)
+from formation_table import formation_slots
+from monitor import CollisionMonitor
+from neighbors import make_index
+from orca import OrcaAvoidance
+from paths import MISSION_PATHS, reference_path
+from recorder import TrajectoryRecorder
+from scheduler import LockStepClock, TickScheduler
+from simulator import make_client
+from state import SwarmState
 import time
 import csv
 import timeit
@@ -9,18 +25,66 @@ import timeit
 
 class VelocityComputation:
     def __init__(self):
-        # Build a connection with AirSim
-        self.client = airsim.MultirotorClient()
-        self.client.confirmConnection()
         self.config = Configuration()
+        # Build a connection with AirSim or the headless simulator
+        self.client = make_client(self.config.backend)
+        self.client.confirmConnection()
         # Define the origin position of the swarm
         self.origin = self.config.origin
         self.origin_x = self.config.origin_x
         self.origin_y = self.config.origin_y
         self.num_uavs = self.config.num_uavs
 
-        # record the trajectory of each UAV
-        self.trajectories = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
+        # Snapshot of every UAV's kinematics, refreshed once per control tick
+        self.registry = self.config.registry
+        self.state = SwarmState(self.registry.names[: self.num_uavs], self.origin)
+
+        # Control loops run at a fixed rate, one command period per tick. In
+        # lock-step mode the period is simulated time and no command is dropped
+        clock = LockStepClock(self.client) if self.config.lockstep else None
+        self.scheduler = TickScheduler(self.config.control_rate, clock)
+
+        # Velocity commands go out over a small pool of extra RPC connections
+        self.dispatcher = CommandDispatcher(
+            lambda: make_client(self.config.backend),
+            self.config.rpc_connections,
+            deadline=None if self.config.lockstep else self.scheduler.period,
+        )
+        # and only for the UAVs whose command changed or is about to expire
+        self.sender = EventTriggeredSender(
+            self.dispatcher,
+            self.config.command_threshold,
+            self.config.command_hold,
+            self.scheduler.clock,
+        )
+
+        # Matching of UAVs to formation slots, kept between ticks
+        self.assigner = None
+        if self.config.assignment_drift is not None:
+            self.assigner = SlotAssigner(self.config.assignment_drift)
+
+        # Predicted conflicts between neighbours, checked after the commands
+        # went out on every monitor_every-th tick
+        self.monitor = CollisionMonitor(
+            self.config.safe_distance,
+            self.config.collision_horizon,
+            every=self.config.monitor_every or 1,
+        )
+        self.tick_pairs = None
+
+        # Optional reciprocal velocity obstacles in place of the repulsion term
+        self.avoidance = None
+        if self.config.avoidance == "orca":
+            self.avoidance = OrcaAvoidance(
+                self.config.avoidance_radius,
+                self.config.avoidance_horizon,
+                period=self.scheduler.period,
+            )
+        elif self.config.avoidance is not None:
+            raise ValueError(f"Unknown avoidance mode: {self.config.avoidance}")
+
+        # Trajectory of each UAV, streamed to disk once formations start
+        self.trajectories = None
         self.t = 0
 
     def set_parameters(
@@ -43,6 +107,14 @@ class VelocityComputation:
         self.d_desired = d_desired
         self.k_rep = k_rep
 
+        # Neighbour lookups are keyed on the interaction radius
+        self.neighbor_index = make_index(
+            self.config.neighbor_index, r_max, self.config.neighbor_skin
+        )
+        self.flocking_terms = select_backend(self.config.force_backend)
+        if self.avoidance is not None:
+            self.avoidance.neighbor_dist = r_max
+
         self.v_cmd = np.zeros([2, self.num_uavs])
         self.v_rep = np.zeros([2, 1])
         self.v_coh = np.zeros([2, 1])
@@ -57,32 +129,23 @@ class VelocityComputation:
         state = self.client.simGetGroundTruthKinematics(vehicle_name=vehicle_name)
         x = state.position.x_val
         y = state.position.y_val
-        i = int(vehicle_name[3])
-        x += self.origin_x[i - 1]
-        y += self.origin_y[i - 1]
+        i = self.registry.index[vehicle_name]
+        x += self.origin_x[i]
+        y += self.origin_y[i]
         pos = np.array([[x], [y]])  # Return a 2D array
         return pos
 
+    def update_state(self):
+        """Fetch the kinematics of every UAV once for the current control tick."""
+        return self.state.update(self.client)
+
     def get_avg_altitude(self):
         # get current z position of all UAVs
-        swarm_altitude = [
-            self.client.getMultirotorState(
-                vehicle_name="UAV" + str(i + 1)
-            ).kinematics_estimated.position.z_val
-            for i in range(self.num_uavs)
-        ]
-        z_cmd = np.mean(swarm_altitude)
-
-        return z_cmd
+        return self.update_state().avg_altitude
 
     def get_swarm_center(self):
         # get center position of all UAVs
-        temp_pos = []
-        for i in range(self.num_uavs):
-            name_i = "UAV" + str(i + 1)
-            temp_pos.append(self.get_UAV_pos(vehicle_name=name_i))
-
-        return np.mean(temp_pos, axis=0)
+        return self.update_state().center
 
     def compute_separation_force(self, pos_i, pos_j):
         r_ij = pos_j - pos_i
@@ -128,380 +191,178 @@ class VelocityComputation:
         return v_sep, v_coh, v_rep
 
     def compute_velocity(self, rep_dis, safe_dis, add_rep):
-        for i in range(self.num_uavs):
-            name_i = "UAV" + str(i + 1)
-            pos_i = self.get_UAV_pos(vehicle_name=name_i)
-            r_mig = self.pos_mig - pos_i
-            N_i = 0
-
-            if np.linalg.norm(r_mig) != 0:
-                v_mig = self.k_mig * r_mig / np.linalg.norm(r_mig)
-            else:
-                v_mig = np.zeros([2, 1])
-
-            for j in range(self.num_uavs):
-                if j != i:
-                    N_i += 1
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = self.get_UAV_pos(vehicle_name=name_j)
-
-                    if np.linalg.norm(pos_j - pos_i) < self.r_max:
-                        v_sep, v_coh, v_rep = self.compute_forces(
-                            pos_i, pos_j, rep_dis, safe_dis, add_rep
-                        )
-                        self.v_sep += v_sep
-                        self.v_coh += v_coh
-                        self.v_rep += v_rep
-
-            self.v_sep /= N_i
-            self.v_coh /= N_i
-            self.v_rep /= N_i
-
-            self.v_cmd[:, i : i + 1] = self.v_sep + self.v_coh + self.v_rep + v_mig
-            if np.linalg.norm(self.v_cmd[:, i : i + 1]) > self.v_max:
-                self.v_cmd[:, i : i + 1] = (
-                    self.v_max
-                    * self.v_cmd[:, i : i + 1]
-                    / np.linalg.norm(self.v_cmd[:, i : i + 1])
-                )
+        # Separation, cohesion, repulsion and migration for the whole swarm at once
+        positions = self.get_all_UAV_positions()
+        add_rep = add_rep and self.avoidance is None
+        v_sep, v_coh, v_rep = self.neighbor_forces(positions, rep_dis, add_rep)
+        v_mig = migration_velocity(positions, self.pos_mig, self.k_mig)
+        v_desired = clamp_speed(v_sep + v_coh + v_rep + v_mig, self.v_max)
+        self.v_cmd[:, :] = self.avoid(positions, v_desired).T
+
+    def neighbor_forces(self, positions, rep_dis, add_rep=True, groups=None):
+        """Separation, cohesion and repulsion over the r_max neighbours of each UAV.
+
+        With groups, separation and cohesion only act, and are averaged,
+        within each sub-swarm while repulsion still keeps UAVs of different
+        groups apart.
+        """
+        # Rebuild the neighbour index once per tick and query it for all UAVs
+        self.neighbor_index.build(positions)
+        pairs = self.neighbor_index.query_pairs(self.r_max)
+        # Kept for the collision monitor, which runs once the tick is sent
+        self.tick_pairs = (positions, pairs)
+        if groups is not None:
+            same = groups.same_group(*pairs)
+            v_sep, v_coh, _ = self.flocking_terms(
+                positions,
+                self.k_sep,
+                self.k_coh,
+                0,
+                self.r_max,
+                pairs=(pairs[0][same], pairs[1][same]),
+            )
+            _, _, v_rep = self.flocking_terms(
+                positions, 0, 0, self.k_rep, self.r_max, rep_dis, add_rep, pairs=pairs
+            )
+            # The kernels average over the whole swarm, these terms over the
+            # other members of each UAV's own group
+            n_others = np.maximum(groups.sizes[groups.labels] - 1, 1)[:, np.newaxis]
+            scale = max(len(positions) - 1, 1) / n_others
+            return v_sep * scale, v_coh * scale, v_rep
+        return self.flocking_terms(
+            positions,
+            self.k_sep,
+            self.k_coh,
+            self.k_rep,
+            self.r_max,
+            rep_dis,
+            add_rep,
+            pairs=pairs,
+        )
+
+    def avoid(self, positions, v_desired):
+        """Closest (N, 2) velocities to v_desired that the avoidance stage allows.
+
+        Reuses the neighbour index built by neighbor_forces this tick and
+        takes the last commands as the velocities the UAVs are flying.
+        """
+        if self.avoidance is None:
+            return v_desired
+        return self.avoidance.velocities(
+            positions,
+            self.v_cmd.T,
+            v_desired,
+            self.v_max,
+            self.neighbor_index,
+        )
 
     def move_UAVs(self, z_cmd):
-        for i in range(self.num_uavs):
-            name_i = "UAV" + str(i + 1)
-            self.client.moveByVelocityZAsync(
-                self.v_cmd[0, i], self.v_cmd[1, i], z_cmd, 0.1, vehicle_name=name_i
-            )
+        # Send the tick's changed commands concurrently over the connection pool
+        sent = self.sender.send_velocities(
+            self.state.names, self.v_cmd, z_cmd, self.scheduler.period
+        )
+        # then check the r_max pairs of the tick for upcoming conflicts
+        if self.config.monitor_every and self.tick_pairs is not None:
+            positions, pairs = self.tick_pairs
+            self.monitor.step(positions, self.state.velocities, pairs=pairs)
+            self.tick_pairs = None
+        return sent
 
     ################################# Formation Generation #################################
     # define the generator function for the formation points
     def point_generator(self, type, spacing):
-        group_center = np.array([[0], [0]])
-        if type == "circle":
-            formation_angle_offset = 2 * np.pi / self.num_uavs
-            for i in range(self.num_uavs):
-                formation_angle = formation_angle_offset * i
-                yield group_center + spacing * np.array(
-                    [[np.cos(formation_angle)], [np.sin(formation_angle)]]
-                )
+        for point in formation_slots(type, self.num_uavs, spacing):
+            yield point.reshape(2, 1)
 
-        elif type == "line":
-            for i in range(self.num_uavs):
-                yield np.array([[i * spacing], [group_center[1, 0]]])
-
-        elif type == "diagonal":
-            for i in range(self.num_uavs):
-                row = col = i  # For a diagonal, row index equals column index
-                yield np.array(
-                    [
-                        [group_center[0, 0] + (col * spacing)],
-                        [group_center[1, 0] + row * spacing],
-                    ]
-                )
-
-        elif type == "V":
-            for i in range(self.num_uavs):
-                yield group_center + np.array(
-                    [
-                        [abs((i - self.num_uavs // 2)) * spacing],
-                        [(i - self.num_uavs // 2) * spacing],
-                    ]
-                )
-        else:
-            raise ValueError(f"Unknown formation type: {type}")
-
-    def calculate_formation_velocity(self, rep_dis, safe_dis, formation_point_gen):
-        v_sep, v_rep, v_coh, N_i = 0, 0, 0, 0
-        for i, formation_point in enumerate(formation_point_gen):
-            # Define the name and position of the current UAV
-            name_i = "UAV" + str(i + 1)
-            pos_i = self.get_UAV_pos(vehicle_name=name_i)
-            self.trajectories[i].append([pos_i[0][0], pos_i[1][0]])
-
-            # Compute the desired velocity for the current UAV
-            v_mig = self.k_mig * (formation_point - pos_i)
-            N_i += 1
-
-            # Compute the repulsion vector if the other UAVs are within the repulsion distance
-            for j in range(self.num_uavs):
-                if j != i:
-                    # Define the name and position of the other UAV
-                    name_j = "UAV" + str(j + 1)
-                    pos_j = self.get_UAV_pos(vehicle_name=name_j)
-                    dist_ij = np.linalg.norm(pos_j - pos_i)
-
-                    if dist_ij < self.r_max:
-                        # Compute the repulsion force
-                        repulsion_force = self.compute_repulsion_force(
-                            pos_i, pos_j, rep_dis, safe_dis, self.k_rep
-                        )
-                        # Add repulsion force to the repulsion velocit
-                        v_rep += repulsion_force
-                        v_sep += self.compute_separation_force(pos_i, pos_j)
-                        v_coh += self.compute_cohesion_force(pos_i, pos_j)
-
-            v_rep /= N_i
-            v_sep /= N_i
-            v_coh /= N_i
-            # Calculate the final desired velocity
-            v_desired = v_mig + v_rep + v_sep + v_coh
-
-            # Limit the velocity to the maximum allowed speed
-            v_desired_norm = np.linalg.norm(v_desired)
-            if v_desired_norm > self.v_max:
-                v_desired = self.v_max * v_desired / v_desired_norm
-
-            self.v_cmd[:, i : i + 1] = v_desired
-
-    def form_V(self, rep_dis, safe_dis, spacing=8):
-        trajectories = [[[] for _ in range(700)] for _ in range(self.num_uavs)]
-        velocities = [[[] for _ in range(700)] for _ in range(self.num_uavs)]
-        for t in range(700):
-            formation_points = self.point_generator("V", spacing)
-
-            v_sep, v_rep, v_coh, N_i = 0, 0, 0, 0
-            for i, formation_point in enumerate(formation_points):
-                # Define the name and position of the current UAV
-                name_i = "UAV" + str(i + 1)
-                pos_i = self.get_UAV_pos(vehicle_name=name_i)
-                trajectories[i][t] = [pos_i[0][0], pos_i[1][0]]
-
-                # Compute the desired velocity for the current UAV
-                v_mig = self.k_mig * (formation_point - pos_i)
-                N_i += 1
-
-                # Compute the repulsion vector if the other UAVs are within the repulsion distance
-                for j in range(self.num_uavs):
-                    if j != i:
-                        # Define the name and position of the other UAV
-                        name_j = "UAV" + str(j + 1)
-                        pos_j = self.get_UAV_pos(vehicle_name=name_j)
-                        dist_ij = np.linalg.norm(pos_j - pos_i)
-
-                        if dist_ij < self.r_max:
-                            # Compute the repulsion force
-                            repulsion_force = self.compute_repulsion_force(
-                                pos_i, pos_j, rep_dis, safe_dis, self.k_rep
-                            )
-                            # Add repulsion force to the repulsion velocit
-                            v_rep += repulsion_force
-                            v_sep += self.compute_separation_force(pos_i, pos_j)
-                            v_coh += self.compute_cohesion_force(pos_i, pos_j)
-                v_rep /= N_i
-                v_sep /= N_i
-                v_coh /= N_i
-                # Calculate the final desired velocity
-                v_desired = v_mig + v_rep + v_sep + v_coh
-
-                # Limit the velocity to the maximum allowed speed
-                v_desired_norm = np.linalg.norm(v_desired)
-                if v_desired_norm > self.v_max:
-                    v_desired = self.v_max * v_desired / v_desired_norm
-
-                self.v_cmd[:, i : i + 1] = v_desired
-
-                velocities[i][t] = [v_desired[0][0], v_desired[1][0]]
+    def assign_slots(self, positions, formation_points):
+        """Reorder the (N, 2) formation points so row i is the slot of UAV i."""
+        if self.assigner is None:
+            return formation_points
+        return self.assigner.assign(positions, formation_points)
 
+    def formation_tick(self, formation_points, rep_dis):
+        """Advance every UAV one control tick towards its (N, 2) formation point."""
+        positions = self.get_all_UAV_positions()
+        formation_points = self.assign_slots(positions, formation_points)
+
+        # Desired velocity of every UAV towards its formation point, limited
+        # to the maximum allowed speed
+        forces = self.neighbor_forces(positions, rep_dis, self.avoidance is None)
+        v_desired = tracking_velocity(
+            positions, formation_points, forces, self.k_mig, self.v_max
+        )
+        v_desired = self.avoid(positions, v_desired)
+        self.v_cmd[:, :] = v_desired.T
+        return positions, v_desired
+
+    def group_tick(self, groups, group_centers, slots, rep_dis):
+        """Advance every sub-swarm one control tick towards slots around its center.
+
+        group_centers is (G, 2) and slots is an (M, 2) table shared by all
+        groups or a (G, M, 2) one per group, M being the largest group size.
+        """
+        positions = self.get_all_UAV_positions()
+        targets = groups.scatter(np.reshape(group_centers, (-1, 1, 2)) + slots)
+
+        forces = self.neighbor_forces(
+            positions, rep_dis, self.avoidance is None, groups=groups
+        )
+        v_desired = tracking_velocity(
+            positions, targets, forces, self.k_mig, self.v_max
+        )
+        v_desired = self.avoid(positions, v_desired)
+        self.v_cmd[:, :] = v_desired.T
+        return positions, v_desired
+
+    def calculate_formation_velocity(self, rep_dis, safe_dis, formation_points):
+        # Accept either an (N, 2) slot table or the old point generator
+        if not isinstance(formation_points, np.ndarray):
+            formation_points = np.hstack(list(formation_points)).T
+        positions, _ = self.formation_tick(formation_points, rep_dis)
+        if self.trajectories is None:
+            self.trajectories = TrajectoryRecorder(
+                "formation_trajectories.csv", self.num_uavs
+            )
+        self.trajectories.record(positions)
+
+    def run_formation(self, type, rep_dis, spacing, steps, prefix):
+        """Drive the swarm into a formation from the slot table and log the run."""
+        formation_points = formation_slots(type, self.num_uavs, spacing)
+        trajectories = TrajectoryRecorder(prefix + "_trajectories.csv", self.num_uavs)
+        velocities = TrajectoryRecorder(prefix + "_velocities.csv", self.num_uavs)
+        for t in self.scheduler.ticks(steps):
+            positions, v_desired = self.formation_tick(formation_points, rep_dis)
+            trajectories.record(positions)
+            velocities.record(v_desired)
             # Set the velocity for each UAV
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
+            self.move_UAVs(self.z_cmd)
 
-        # Move the file writing part outside of the loop
-        with open("vc_trajectories.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            for t in range(700):
-                row = []
-                for i in range(self.num_uavs):
-                    row.extend(trajectories[i][t])
-                writer.writerow(row)
-
-            # Write velocities to a new CSV file
-        with open("vc_velocities.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            for t in range(700):
-                row = []
-                for i in range(self.num_uavs):
-                    row.extend(velocities[i][t])
-                writer.writerow(row)
+        trajectories.close()
+        velocities.close()
 
-    def form_circle(self, rep_dis, safe_dis, spacing=17):
-        trajectories = [[[] for _ in range(700)] for _ in range(self.num_uavs)]
-        velocities = [[[] for _ in range(700)] for _ in range(self.num_uavs)]
-
-        for t in range(700):
-            formation_points = self.point_generator("circle", spacing)
-
-            v_sep, v_rep, v_coh, N_i = 0, 0, 0, 0
-            for i, formation_point in enumerate(formation_points):
-                # Define the name and position of the current UAV
-                name_i = "UAV" + str(i + 1)
-                pos_i = self.get_UAV_pos(vehicle_name=name_i)
-                trajectories[i][t] = [pos_i[0][0], pos_i[1][0]]
-
-                # Compute the desired velocity for the current UAV
-                v_mig = self.k_mig * (formation_point - pos_i)
-                N_i += 1
-
-                # Compute the repulsion vector if the other UAVs are within the repulsion distance
-                for j in range(self.num_uavs):
-                    if j != i:
-                        # Define the name and position of the other UAV
-                        name_j = "UAV" + str(j + 1)
-                        pos_j = self.get_UAV_pos(vehicle_name=name_j)
-                        dist_ij = np.linalg.norm(pos_j - pos_i)
-
-                        if dist_ij < self.r_max:
-                            # Compute the repulsion force
-                            repulsion_force = self.compute_repulsion_force(
-                                pos_i, pos_j, rep_dis, safe_dis, self.k_rep
-                            )
-                            # Add repulsion force to the repulsion velocit
-                            v_rep += repulsion_force
-                            v_sep += self.compute_separation_force(pos_i, pos_j)
-                            v_coh += self.compute_cohesion_force(pos_i, pos_j)
-                v_rep /= N_i
-                v_sep /= N_i
-                v_coh /= N_i
-                # Calculate the final desired velocity
-                v_desired = v_mig + v_rep + v_sep + v_coh
-
-                # Limit the velocity to the maximum allowed speed
-                v_desired_norm = np.linalg.norm(v_desired)
-                if v_desired_norm > self.v_max:
-                    v_desired = self.v_max * v_desired / v_desired_norm
-
-                velocities[i][t] = [v_desired[0][0], v_desired[1][0]]
-
-                self.v_cmd[:, i : i + 1] = v_desired
-
-            # Set the velocity for each UAV
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
+    def form_V(self, rep_dis, safe_dis, spacing=8):
+        self.run_formation("V", rep_dis, spacing, 700, "vc")
 
-        # Move the file writing part outside of the loop
-        with open("cv_trajectories.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            for t in range(700):
-                row = []
-                for i in range(self.num_uavs):
-                    row.extend(trajectories[i][t])
-                writer.writerow(row)
-
-            # Write velocities to a new CSV file
-        with open("cv_velocities.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            for t in range(700):
-                row = []
-                for i in range(self.num_uavs):
-                    row.extend(velocities[i][t])
-                writer.writerow(row)
+    def form_circle(self, rep_dis, safe_dis, spacing=17):
+        self.run_formation("circle", rep_dis, spacing, 700, "cv")
 
     def form_line(self, rep_dis, safe_dis, spacing=17):
-        # save the trajectories and velocities of each UAV
-        trajectories = [[[] for _ in range(800)] for _ in range(self.num_uavs)]
-        velocities = [[[] for _ in range(800)] for _ in range(self.num_uavs)]
-        for t in range(800):
-            formation_points = self.point_generator("line", spacing)
-            v_sep, v_rep, v_coh, N_i = 0, 0, 0, 0
-            for i, formation_point in enumerate(formation_points):
-                name_i = "UAV" + str(i + 1)
-                pos_i = self.get_UAV_pos(vehicle_name=name_i)
-                trajectories[i][t] = [pos_i[0][0], pos_i[1][0]]
-                v_mig = self.k_mig * (formation_point - pos_i)
-                N_i += 1
-                for j in range(self.num_uavs):
-                    if j != i:
-                        # Define the name and position of the other UAV
-                        name_j = "UAV" + str(j + 1)
-                        pos_j = self.get_UAV_pos(vehicle_name=name_j)
-                        dist_ij = np.linalg.norm(pos_j - pos_i)
-
-                        if dist_ij < self.r_max:
-                            # Compute the repulsion force
-                            repulsion_force = self.compute_repulsion_force(
-                                pos_i, pos_j, rep_dis, safe_dis, self.k_rep
-                            )
-                            # Add repulsion force to the repulsion velocit
-                            v_rep += repulsion_force
-                            v_sep += self.compute_separation_force(pos_i, pos_j)
-                            v_coh += self.compute_cohesion_force(pos_i, pos_j)
-                v_rep /= N_i
-                v_sep /= N_i
-                v_coh /= N_i
-                # Calculate the final desired velocity
-                v_desired = v_mig + v_rep + v_sep + v_coh
-
-                # Limit the velocity to the maximum allowed speed
-                v_desired_norm = np.linalg.norm(v_desired)
-                if v_desired_norm > self.v_max:
-                    v_desired = self.v_max * v_desired / v_desired_norm
-
-                velocities[i][t] = [v_desired[0][0], v_desired[1][0]]
-                self.v_cmd[:, i : i + 1] = v_desired
+        self.run_formation("line", rep_dis, spacing, 800, "cl")
 
-            # Set the velocity for each UAV
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
+    def form_grid(self, rep_dis, safe_dis, spacing=5):
+        self.run_formation("grid", rep_dis, spacing, 500, "cg")
 
-        # Move the file writing part outside of the loop
-        with open("cl_trajectories.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            for t in range(800):
-                row = []
-                for i in range(self.num_uavs):
-                    row.extend(trajectories[i][t])
-                writer.writerow(row)
-
-                # Write velocities to a new CSV file
-        with open("cl_velocities.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            for t in range(800):
-                row = []
-                for i in range(self.num_uavs):
-                    row.extend(velocities[i][t])
-                writer.writerow(row)
-
-    #############################################################################################
-    # Path generator - refactor the code to use this function
-    # def form_circle(self, rep_dis, safe_dis, spacing=15):
-    #     formation_points = self.point_generator('circle', spacing)
-    #     self.calculate_formation_velocity(rep_dis, safe_dis, formation_points)
-
-    # def form_line(self, rep_dis, safe_dis, spacing=12):
-    #     formation_points = self.point_generator('line', spacing)
-    #     self.calculate_formation_velocity(rep_dis, safe_dis, formation_points)
-
-    # def form_diagonal(self, rep_dis, safe_dis, spacing=10):
-    #     formation_points = self.point_generator('diagonal', spacing)
-    #     self.calculate_formation_velocity(rep_dis, safe_dis, formation_points)
+    def form_slanted_line(self, rep_dis, safe_dis, spacing=8):
+        self.run_formation("slanted_line", rep_dis, spacing, 500, "cs")
+
+    def form_diagonal(self, rep_dis, safe_dis, spacing=10):
+        # Single control tick, driven by FormationController.diagonal
+        formation_points = formation_slots("diagonal", self.num_uavs, spacing)
+        self.calculate_formation_velocity(rep_dis, safe_dis, formation_points)
 
     # find the position of the UAV
     def get_all_UAV_positions(self):
-        positions = np.zeros((self.num_uavs, 2))
-        for i in range(self.num_uavs):
-            name_i = "UAV" + str(i + 1)
-            positions[i, :] = self.get_UAV_pos(vehicle_name=name_i).flatten()
-        return positions
+        return self.update_state().positions.copy()
 
     # compute the density of the swarm
     def compute_density(self):
@@ -525,375 +386,146 @@ class VelocityComputation:
 
     #################################### TASK Velocity ####################################
     def circle_move_circle(self):
-        trajectories = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
-        velocities = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
-        for t in range(600):
-            # Use a non-linear function for angle calculation
-            angle = (
-                2 * np.pi * t / 600
-            )  # Angle based on the current time step（we hope have a circle movement）
-            group_center_radius = (
-                60  # Set the radius of the circle for the group center
+        trajectories = TrajectoryRecorder("cc_trajectories.csv", self.num_uavs)
+        velocities = TrajectoryRecorder("cc.csv", self.num_uavs)
+        type, params, steps = MISSION_PATHS["circle_search"]
+        path = reference_path(
+            type, self.num_uavs, steps, self.config.path_cache, **params
+        )
+        for t in self.scheduler.ticks(steps):
+            positions = self.get_all_UAV_positions()
+            formation_points = path[t]
+
+            # Calculate the desired velocity for each UAV to reach its formation point
+            forces = self.neighbor_forces(positions, 10, self.avoidance is None)
+            v_desired = tracking_velocity(
+                positions, formation_points, forces, self.k_mig
             )
-            # Calculate the swarm center point
-            group_center = group_center_radius * np.array(
-                [[np.cos(angle)], [np.sin(angle)]]
-            )
-
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                pos_i = self.get_UAV_pos(
-                    vehicle_name=name_i
-                )  # store the position of the current UAV
-
-                trajectories[i][t] = [pos_i[0][0], pos_i[1][0]]
-                # Define the formation points for each UAV within the group
-                formation_radius = 15  # Distance between the UAVs in the formation
-                formation_angle_offset = (
-                    2 * np.pi / 9
-                )  # Angular offset between UAVs in the formation
-                formation_angle = (
-                    formation_angle_offset * i
-                )  # calculates the specific angle for the current UAV based on its index
-                formation_point = group_center + formation_radius * np.array(
-                    [[np.cos(formation_angle)], [np.sin(formation_angle)]]
-                )
-
-                # Calculate the desired velocity for each UAV to reach its formation point
-                v_mig = self.k_mig * (formation_point - pos_i)
-                # Collision avoidance
-                v_rep = np.zeros([2, 1])
-                N_i = 0
-
-                for j in range(self.num_uavs):
-                    if j != i:
-                        N_i += 1
-                        name_j = "UAV" + str(j + 1)
-                        pos_j = self.get_UAV_pos(vehicle_name=name_j)
-                        if np.linalg.norm(pos_j - pos_i) < self.r_max:
-                            v_sep, v_coh, v_rep = self.compute_forces(
-                                pos_i, pos_j, 10, 5, True
-                            )
-                            self.v_sep += v_sep
-                            self.v_coh += v_coh
-                            self.v_rep += v_rep
-
-                self.v_sep /= N_i
-                self.v_coh /= N_i
-                self.v_rep /= N_i
-
-                self.v_cmd[:, i : i + 1] = self.v_sep + self.v_coh + self.v_rep + v_mig
-                # if np.linalg.norm(self.v_cmd[:, i:i + 1]) > self.v_max:
-                #     self.v_cmd[:, i:i + 1] = self.v_max * self.v_cmd[:, i:i + 1] / np.linalg.norm(self.v_cmd[:, i:i + 1])
-                velocities[i][t] = [self.v_cmd[0, i], self.v_cmd[1, i]]
+            # Collision avoidance
+            v_desired = self.avoid(positions, v_desired)
+            self.v_cmd[:, :] = v_desired.T
+            trajectories.record(positions)
+            velocities.record(v_desired)
 
             # Set the velocity for each UAV
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                print("test")
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
-
-            # # Set the velocity for each UAV
             self.move_UAVs(self.z_cmd)
 
-            # Set the velocity for each UAV
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
+        trajectories.close()
+        velocities.close()
+
+    def split_move_circle(self, num_groups=3, method="index", spacing=5):
+        """Fly num_groups sub-swarms around a common circle, each in its own ring."""
+        groups = self.config.split(num_groups, method)
+        slots = formation_slots("circle", groups.sizes.max(), spacing)
+        offsets = 2 * np.pi * np.arange(groups.num_groups) / groups.num_groups
+        trajectories = TrajectoryRecorder("sg_trajectories.csv", self.num_uavs)
+        for t in self.scheduler.ticks(600):
+            angle = offsets + 2 * np.pi * t / 600
+            group_centers = 15 * np.stack([np.cos(angle), np.sin(angle)], 1)
+            positions, _ = self.group_tick(groups, group_centers, slots, 3)
+            trajectories.record(positions)
+
+            self.move_UAVs(self.z_cmd)
 
-            with open("cc_trajectories.csv", "w", newline="") as file:
-                writer = csv.writer(file)
-                for t in range(600):
-                    row = []
-                    for i in range(self.num_uavs):
-                        row.extend(trajectories[i][t])
-                    writer.writerow(row)
-
-                    # Write velocities to a new CSV file
-            with open("cc.csv", "w", newline="") as file:
-                writer = csv.writer(file)
-                for t in range(600):
-                    row = []
-                    for i in range(self.num_uavs):
-                        row.extend(velocities[i][t])
-                    writer.writerow(row)
+        trajectories.close()
 
     def V_move_circle(self):
-        velocities = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
-        trajectories = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
-        for t in range(600):
-            angle = 2 * np.pi * t / 800
-            group_center_radius = 70
-            spacing = 8
-            group_center = group_center_radius * np.array(
-                [[np.cos(angle)], [np.sin(angle)]]
+        trajectories = TrajectoryRecorder("t_trajectories.csv", self.num_uavs)
+        velocities = TrajectoryRecorder("v.csv", self.num_uavs)
+        type, params, steps = MISSION_PATHS["circle_v_search"]
+        path = reference_path(
+            type, self.num_uavs, steps, self.config.path_cache, **params
+        )
+        for t in self.scheduler.ticks(steps):
+            positions = self.get_all_UAV_positions()
+            formation_points = self.assign_slots(positions, path[t])
+            forces = self.neighbor_forces(positions, 8, self.avoidance is None)
+            v_desired = tracking_velocity(
+                positions, formation_points, forces, self.k_mig, rep_gain=2
             )
 
-            formation_points = []
-            for i in range(self.num_uavs):
-                point = np.array(
-                    [
-                        [abs((i - self.num_uavs // 2)) * spacing],
-                        [(i - self.num_uavs // 2) * spacing],
-                    ]
-                )
-                formation_angle = angle - np.pi / 2
-                rotation_matrix = np.array(
-                    [
-                        [np.cos(formation_angle), -np.sin(formation_angle)],
-                        [np.sin(formation_angle), np.cos(formation_angle)],
-                    ]
-                )
-                rotated_point = np.dot(rotation_matrix, point) + group_center
-                formation_points.append(rotated_point)
-
-            for i, formation_point in enumerate(formation_points):
-                N_i = 0
-                name_i = "UAV" + str(i + 1)
-                pos_i = self.get_UAV_pos(vehicle_name=name_i)
-                v_mig = self.k_mig * (formation_point - pos_i)
-
-                trajectories[i][t] = [pos_i[0][0], pos_i[1][0]]
-
-                # Perform collision avoidance with other drones
-                for j in range(self.num_uavs):
-                    if j != i:
-                        N_i += 1
-                        name_j = "UAV" + str(j + 1)
-                        pos_j = self.get_UAV_pos(vehicle_name=name_j)
-
-                        if np.linalg.norm(pos_j - pos_i) < self.r_max:
-                            v_sep, v_coh, v_rep = self.compute_forces(
-                                pos_i, pos_j, 8, 3, True
-                            )
-                            self.v_sep += v_sep
-                            self.v_coh += v_coh
-                            self.v_rep += v_rep * 2
-
-                self.v_sep /= N_i
-                self.v_coh /= N_i
-                self.v_rep /= N_i
-
-                v_desired = self.v_sep + self.v_coh + self.v_rep + v_mig
-                # Limit the velocity to the maximum allowed speed
-                # v_desired_norm = np.linalg.norm(v_desired)
-                # if v_desired_norm > self.v_max:
-                #     v_desired = self.v_max * v_desired / v_desired_norm
-                velocities[i][t] = [v_desired[0][0], v_desired[1][0]]
-                self.v_cmd[:, i : i + 1] = v_desired
+            # Perform collision avoidance with other drones
+            v_desired = self.avoid(positions, v_desired)
+            self.v_cmd[:, :] = v_desired.T
+            trajectories.record(positions)
+            velocities.record(v_desired)
 
             # Set the velocity for each UAV
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
+            self.move_UAVs(self.z_cmd)
 
-            with open("t_trajectories.csv", "w", newline="") as file:
-                writer = csv.writer(file)
-                for t in range(600):
-                    row = []
-                    for i in range(self.num_uavs):
-                        row.extend(trajectories[i][t])
-                    writer.writerow(row)
-
-                    # Write velocities to a new CSV file
-            with open("v.csv", "w", newline="") as file:
-                writer = csv.writer(file)
-                for t in range(600):
-                    row = []
-                    for i in range(self.num_uavs):
-                        row.extend(velocities[i][t])
-                    writer.writerow(row)
+        trajectories.close()
+        velocities.close()
 
     # space occupation
     def space_ccupation(self):
-        trajectories = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
-        for t in range(600):
-            target_point = np.zeros([2, 1])
-            x = target_point[0][0]  # x coordinate
-            y = target_point[1][0]  # y coordinate
-            y_max = y - 70
-            y_min = y + 70
-            x_max = x - 70
-            x_min = x + 70
-
-            n_drones = self.num_uavs
-            np.random.seed(0)  # for consistency
-            drone_positions = np.random.rand(n_drones, 2) * [
-                x_max - x_min,
-                y_max - y_min,
-            ] + [x_min, y_min]
-            vor = Voronoi(drone_positions)
-
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                pos_i = self.get_UAV_pos(vehicle_name=name_i)  # (2, 1)
-                trajectories[i][t] = [pos_i[0][0], pos_i[1][0]]
-                pos_i = np.squeeze(pos_i)
-                r_mig = drone_positions[i] - pos_i
-                r_mig = np.expand_dims(r_mig, axis=1)
-                v_mig = self.k_mig * r_mig / np.linalg.norm(r_mig)
-                N_i = 0
-                region = vor.point_region[i]
-
-                if not -1 in vor.regions[region]:
-                    polygon = [vor.vertices[j] for j in vor.regions[region]]
-                    centroid = np.mean(polygon, axis=0)
-                    name_i = "UAV" + str(i + 1)
-                    pos_i = self.get_UAV_pos(vehicle_name=name_i)  # (2, 1)
-                    pos_i = np.squeeze(pos_i)
-                    r_mig = centroid - pos_i
-                    r_mig = np.expand_dims(r_mig, axis=1)
-                    v_mig = self.k_mig * r_mig / np.linalg.norm(r_mig)
-
-                for j in range(self.num_uavs):
-                    if j != i:
-                        N_i += 1
-                        name_j = "UAV" + str(j + 1)
-                        pos_j = self.get_UAV_pos(vehicle_name=name_j)
-
-                        if np.linalg.norm(pos_j - pos_i) < self.r_max:
-                            v_sep, v_coh, v_rep = self.compute_forces(
-                                pos_i, pos_j, 10, 5, True
-                            )
-
-                            self.v_sep += np.mean(v_sep, axis=1, keepdims=True)
-                            self.v_coh += np.mean(v_coh, axis=1, keepdims=True)
-                            self.v_rep += 2 * np.mean(v_rep, axis=1, keepdims=True)
-
-                self.v_sep /= N_i
-                self.v_coh /= N_i
-                self.v_rep /= N_i
-
-                self.v_cmd[:, i : i + 1] = self.v_sep + self.v_coh + self.v_rep + v_mig
-                if np.linalg.norm(self.v_cmd[:, i : i + 1]) > self.v_max:
-                    self.v_cmd[:, i : i + 1] = (
-                        self.v_max
-                        * self.v_cmd[:, i : i + 1]
-                        / np.linalg.norm(self.v_cmd[:, i : i + 1])
-                    )
-
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
+        trajectories = TrajectoryRecorder(
+            "so_trajectories.csv",
+            self.num_uavs,
+            header=[name + axis for name in self.state.names for axis in ("_X", "_Y")],
+        )
+        # Cover the 140 m square around the target point
+        target_point = np.zeros(2)
+        coverage = CoverageController(target_point - 70, target_point + 70)
+        for t in self.scheduler.ticks(600):
+            positions = self.get_all_UAV_positions()
+            v_sep, v_coh, v_rep = self.neighbor_forces(
+                positions, 10, self.avoidance is None
+            )
+            trajectories.record(positions)
+
+            # Head for the centroid of the own bounded Voronoi cell
+            v_mig = migration_velocity(
+                positions, coverage.targets(positions), self.k_mig
+            )
+            v_desired = clamp_speed(v_sep + v_coh + 2 * v_rep + v_mig, self.v_max)
+            self.v_cmd[:, :] = self.avoid(positions, v_desired).T
 
-                with open("so_trajectories.csv", "w", newline="") as file:
-                    writer = csv.writer(file)
-                    for i in range(self.num_uavs):
-                        writer.writerow(
-                            ["UAV" + str(i + 1) + "_X", "UAV" + str(i + 1) + "_Y"]
-                        )
+            self.move_UAVs(self.z_cmd)
 
-                    for t in range(600):
-                        row = []
-                        for i in range(self.num_uavs):
-                            row.extend(trajectories[i][t])
-                        writer.writerow(row)
+        trajectories.close()
 
     def line_search(self, spacing=15):
-        trajectories = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
-        velocities = [[[] for _ in range(600)] for _ in range(self.num_uavs)]
+        trajectories = TrajectoryRecorder("ll_trajectories.csv", self.num_uavs)
+        velocities = TrajectoryRecorder("ll.csv", self.num_uavs)
         target = np.array([[0], [-500]])
         group_center = self.get_swarm_center()
         initial_formation_points = [
             group_center + np.array([[i * spacing], [0]]) for i in range(self.num_uavs)
         ]
 
-        for t in range(600):
-            group_center = self.get_swarm_center()
-            v_center_to_target = target - group_center
-
-            for i, initial_formation_point in enumerate(initial_formation_points):
-                formation_point = initial_formation_point + v_center_to_target
-
-                name_i = "UAV" + str(i + 1)
-                pos_i = self.get_UAV_pos(vehicle_name=name_i)
-                trajectories[i][t] = [pos_i[0][0], pos_i[1][0]]
-                v_mig = self.k_mig * (formation_point - pos_i)
-                N_i = 0
-
-                for j in range(self.num_uavs):
-                    if j != i:
-                        N_i += 1
-                        name_j = "UAV" + str(j + 1)
-                        pos_j = self.get_UAV_pos(vehicle_name=name_j)
-                        if np.linalg.norm(pos_j - pos_i) < self.r_max:
-                            v_sep, v_coh, v_rep = self.compute_forces(
-                                pos_i, pos_j, 10, 3, True
-                            )
-                            self.v_sep += v_sep
-                            self.v_coh += v_coh
-                            self.v_rep += v_rep * 2
-
-                self.v_sep /= N_i
-                self.v_coh /= N_i
-                self.v_rep /= N_i
-
-                v_desired = self.v_sep + self.v_coh + self.v_rep + v_mig
-                v_desired_norm = np.linalg.norm(v_desired)
-                if v_desired_norm > self.v_max:
-                    v_desired = self.v_max * v_desired / v_desired_norm
-
-                velocities[i][t] = [v_desired[0][0], v_desired[1][0]]
-
-                self.v_cmd[:, i : i + 1] = v_desired
-
-            for i in range(self.num_uavs):
-                name_i = "UAV" + str(i + 1)
-                self.client.moveByVelocityZAsync(
-                    self.v_cmd[0, i],
-                    self.v_cmd[1, i],
-                    self.z_cmd,
-                    0.1,
-                    vehicle_name=name_i,
-                )
+        for t in self.scheduler.ticks(600):
+            state = self.update_state()
+            v_center_to_target = target - state.center
 
-            with open("ll_trajectories.csv", "w", newline="") as file:
-                writer = csv.writer(file)
-                for t in range(600):
-                    row = []
-                    for i in range(self.num_uavs):
-                        row.extend(trajectories[i][t])
-                    writer.writerow(row)
-
-            with open("ll.csv", "w", newline="") as file:
-                writer = csv.writer(file)
-                for t in range(600):
-                    row = []
-                    for i in range(self.num_uavs):
-                        row.extend(velocities[i][t])
-                    writer.writerow(row)
+            formation_points = (
+                np.hstack(initial_formation_points).T + v_center_to_target.T
+            )
+            positions = state.positions
+            forces = self.neighbor_forces(positions, 10, self.avoidance is None)
+            v_desired = tracking_velocity(
+                positions, formation_points, forces, self.k_mig, self.v_max, 2
+            )
+            v_desired = self.avoid(positions, v_desired)
+            self.v_cmd[:, :] = v_desired.T
+            trajectories.record(positions)
+            velocities.record(v_desired)
+
+            self.move_UAVs(self.z_cmd)
+
+        trajectories.close()
+        velocities.close()
 
     def get_collision_info(self):
-        for i in range(self.num_uavs):
-            name = f"UAV{i+1}"
-            collision_info = self.client.simGetCollisionInfo(vehicle_name=name)
-            if collision_info.has_collided:
-                print(f"UAV{i+1} collided with {collision_info.object_name}")
-                return True
+        # Check the whole swarm from one snapshot instead of polling every UAV
+        state = self.update_state()
+        i, j, t, d = self.monitor.check(state.positions, state.velocities)
+        for a, b, t_ab, d_ab in zip(i, j, t, d):
+            print(
+                f"{state.names[a]} and {state.names[b]} within {d_ab:.1f} m "
+                f"in {t_ab:.1f} s"
+            )
+        if len(i):
+            return True
         print("No collisions detected")
         return False
 
@@ -905,7 +537,7 @@ class VelocityComputation:
         start_time = time.time()
 
         for i in range(self.num_uavs):
-            name_i = "UAV" + str(i + 1)
+            name_i = self.state.names[i]
             state = self.client.getMultirotorState(vehicle_name=name_i)
             position = state.kinematics_estimated.position
             elapsed_time = time.time() - start_time